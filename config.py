@@ -1,12 +1,21 @@
+import copy
 import json
 import logging
+import os
 import sys
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
+
+from utils import atomic_write_bytes, json_dumps, read_json_file
 
 logger = logging.getLogger("media_manager")
 CONFIG_FILE_PATH = Path("config.json")
 
+# Worker defaults follow the host: downloads are I/O bound, FFmpeg leaves one core for everything else.
+# The MAX_*_WORKERS settings only cap these; null in config.json means use the default as is
+DEFAULT_DOWNLOAD_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+DEFAULT_FFMPEG_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
 DEFAULT_CONFIG = {
     "TMDB_API_KEY": "YOUR_API_KEY",
     "MOVIE_LIBRARY": "~/Movies",
@@ -17,8 +26,8 @@ DEFAULT_CONFIG = {
     "START_YEAR": 2025,
     "END_YEAR": 2026,
     "PAGES_PER_YEAR": 5,
-    "MAX_DOWNLOAD_WORKERS": 4,
-    "MAX_FFMPEG_WORKERS": 4,
+    "MAX_DOWNLOAD_WORKERS": None,
+    "MAX_FFMPEG_WORKERS": None,
     "CREATE_BACKDROP": False,
     "PLACEHOLDER_DURATION": 3,
     "PLACEHOLDER_RESOLUTION": "1920x1080",
@@ -30,7 +39,13 @@ DEFAULT_CONFIG = {
     },
 }
 
-KNOWN_FAILURES_FILENAME = "known_failures.json"
+KNOWN_FAILURES_FILENAME = "known_failures.bin"
+# One {movie_id: entry} object per line, so a sanitize run can append what it catalogs
+LIBRARY_FILENAME = "library.jsonl"
+# The single-object format used before, converted on first load
+LEGACY_LIBRARY_FILENAME = "library.json"
+TRAILER_KEYS_FILENAME = "trailer_keys.json"
+SEARCH_CACHE_FILENAME = "search_cache.json"
 TRAILER_SUFFIX = "-trailer"
 BACKDROP_FILENAME = "backdrop.jpg"
 STATUS_FILENAME = "umm_status.json"
@@ -39,45 +54,64 @@ STATUS_FILENAME = "umm_status.json"
 BASE_URL = "https://api.themoviedb.org/3"
 DISCOVER_URL = f"{BASE_URL}/discover/movie"
 
+class FirstRunCreated(Exception):
+    # Raised by load_config after it writes a fresh default config.json. The caller decides
+    # whether to exit, so load_config can be reused in-process (e.g. prompt, then retry).
+    pass
+
+
+# (st_mtime_ns, parsed config) of the last config.json we read or wrote
+_cached_config: Optional[Tuple[int, Dict[str, Any]]] = None
+
 
 def load_config() -> Dict[str, Any]:
-    if not CONFIG_FILE_PATH.exists():
+    global _cached_config
+    # A single stat both tells whether the file exists and whether it changed since the last parse
+    try:
+        mtime_ns = CONFIG_FILE_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
         try:
-            with CONFIG_FILE_PATH.open("w", encoding="utf-8") as f:
-                json.dump(DEFAULT_CONFIG, f, indent=4)
+            atomic_write_bytes(CONFIG_FILE_PATH, json_dumps(DEFAULT_CONFIG, indent=True))
             logger.info(f"Created default config file at [cyan]{CONFIG_FILE_PATH.resolve()}[/cyan]")
             logger.info("Please edit this file to add your TMDB_API_KEY.")
-            sys.exit(0)
         except IOError as e:
             logger.error(f"Failed to create config file: {e}")
             sys.exit(1)
+        raise FirstRunCreated(CONFIG_FILE_PATH) from None
+    except OSError as e:
+        logger.error(f"Failed to read or parse config file: {e}")
+        sys.exit(1)
 
     try:
-        with CONFIG_FILE_PATH.open("r", encoding="utf-8") as f:
-            config_data = json.load(f)
-            # --- This is a new "migration" check ---
-            # It checks if any keys from the default config are missing
-            # If so, it adds them and saves the file.
-            missing_keys = False
-            for key, value in DEFAULT_CONFIG.items():
-                if key not in config_data:
-                    config_data[key] = value
-                    missing_keys = True
-
-            if missing_keys:
-                logger.warning("[yellow]Old config file detected. Adding new default settings...[/yellow]")
-                save_config(config_data)
-
-            return config_data
+        # Callers mutate the returned dict, so always hand out a copy of the cached one.
+        if _cached_config is not None and _cached_config[0] == mtime_ns:
+            return copy.deepcopy(_cached_config[1])
+
+        config_data = read_json_file(CONFIG_FILE_PATH)
+        # --- This is a new "migration" check ---
+        # It checks if any keys from the default config are missing
+        # If so, it adds them and saves the file.
+        missing_keys = DEFAULT_CONFIG.keys() - config_data.keys()
+
+        if missing_keys:
+            config_data = DEFAULT_CONFIG | config_data
+            logger.warning("[yellow]Old config file detected. Adding new default settings...[/yellow]")
+            save_config(config_data)
+        else:
+            _cached_config = (mtime_ns, copy.deepcopy(config_data))
+
+        return config_data
 
     except (IOError, json.JSONDecodeError) as e:
         logger.error(f"Failed to read or parse config file: {e}")
         sys.exit(1)
 
 def save_config(config_data: Dict[str, Any]):
+    global _cached_config
     try:
-        with CONFIG_FILE_PATH.open("w", encoding="utf-8") as f:
-            json.dump(config_data, f, indent=4)
+        atomic_write_bytes(CONFIG_FILE_PATH, json_dumps(config_data, indent=True))
+        # Refresh the memo directly; mtime granularity can be too coarse to notice back-to-back writes
+        _cached_config = (CONFIG_FILE_PATH.stat().st_mtime_ns, copy.deepcopy(config_data))
         logger.info(f"Successfully updated [cyan]{CONFIG_FILE_PATH.resolve()}[/cyan]")
     except IOError as e:
         logger.error(f"Failed to save config file: {e}")
\ No newline at end of file
@@ -1,12 +1,18 @@
 # mult1v4c/umm/umm-a89e29615fabfbb6e2334882de581ce3e1669695/media_manager.py
+import atexit
 import csv
 import json
 import logging
+import os
+import sys
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from array import array
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from functools import partial
+from itertools import count, islice
 from pathlib import Path
-from typing import Dict, Any, List, Callable, Set, Optional
+from typing import Dict, Any, Iterator, List, Callable, Set, Optional, Tuple
 
 from rich.console import Console, Group
 from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn, TimeRemainingColumn
@@ -16,36 +22,79 @@ from rich.text import Text
 from rich.align import Align
 from rich import box
 
-from config import KNOWN_FAILURES_FILENAME, TRAILER_SUFFIX, STATUS_FILENAME, load_config, save_config
+from config import (
+    DEFAULT_DOWNLOAD_WORKERS, DEFAULT_FFMPEG_WORKERS, KNOWN_FAILURES_FILENAME, LEGACY_LIBRARY_FILENAME,
+    LIBRARY_FILENAME, TRAILER_SUFFIX, STATUS_FILENAME, FirstRunCreated, load_config, save_config,
+)
 from services.tmdb_service import TMDbService
 from services.downloader_service import DownloaderService
 from services.asset_generator_service import AssetGeneratorService
 from services.file_system_manager import FileSystemManager, MoviePaths
 from services.sanitizer_service import SanitizerService
 from services.junk_service import JunkService
-from utils import format_time_ago
+from utils import (
+    append_jsonl, atomic_write_bytes, format_time_ago, load_jsonl_dict, migrate_json_to_jsonl, read_json_file,
+    write_jsonl_dict,
+)
 
 logger = logging.getLogger("media_manager")
 
+# The failures journal is rewritten at exit once unique IDs drop below this share of its records
+FAILURES_COMPACT_RATIO = 0.75
+# Workers mostly wait on subprocesses, so a slow redraw is plenty and keeps the render thread off the GIL
+PROGRESS_REFRESH_PER_SECOND = 2
+# Threads used to look up TMDB trailer keys ahead of the downloads
+TMDB_PREFETCH_WORKERS = 32
+# Most trailers handed to one yt-dlp process, so its startup cost is paid per batch instead of per movie
+DOWNLOAD_BATCH_SIZE = 32
+
+
+def _capped_workers(configured: Optional[int], default: int) -> int:
+    return min(configured, default) if configured else default
+
 
 class MediaManager:
     def __init__(self, config: Dict, console: Console, is_dry_run: Callable[[], bool]):
         self.cfg = config
         self.console = console
         self.is_dry_run = is_dry_run
-        self.failures = 0
-        self.failure_lock = threading.Lock()
-        self.stats = {"downloads": [], "placeholders": 0, "backdrops": 0}
+        # Each download thread appends new failures to its own list; they are merged once the pool drains
+        self._failure_local = threading.local()
+        self._failure_batches: List[List[int]] = []
+        self._failure_batches_lock = threading.Lock()
+        # "downloads" holds (folder, downloaded, reason) rows, ready for csv.writer.writerows
+        self.stats = {"downloads": [], "placeholders": 0, "backdrops": 0, "abort_reason": None}
+        # Only the thread driving a run writes to stats; FFmpeg workers report through their futures' results
         self.known_failures: set[int] = set()
+        # Read-only snapshot taken at load time; workers check this instead of the set they add to
+        self._known_failures_ro: frozenset[int] = frozenset()
+        # (id(fs_manager), movie_id) -> (folder_name, paths), filled while filtering so downloads don't rebuild them
+        self._paths_cache: Dict[Tuple[int, int], Tuple[str, MoviePaths]] = {}
+        # Folders known to exist during the current pipeline run (seeded from the filter's snapshot),
+        # so downloads skip the mkdir syscalls. Cleared after each run in case folders are removed meanwhile
+        self._created_dirs: Set[str] = set()
+        # Worker pools outlive a single run so repeated menu actions reuse their threads:
+        # name -> (pool, worker count). A pool is rebuilt when its worker setting changes or an abort shut it down
+        self._pools: Dict[str, Tuple[ThreadPoolExecutor, int]] = {}
         self.library_path = Path(config["MOVIE_LIBRARY"]).expanduser()
         self.download_path = Path(config["DOWNLOAD_FOLDER"]).expanduser()
-        self.library_cache_path = self.library_path / "library.json"
+        self.library_cache_path = self.library_path / LIBRARY_FILENAME
         self.video_extensions: Set[str] = {".mkv", ".mp4", ".avi", ".mov", ".wmv", ".flv"}
 
         self.cache_folder = Path(self.cfg["CACHE_FOLDER"]).expanduser()
         self.junk_cache_path = self.cache_folder / "junk_cache.json"
         self.tmdb_cache_path = self.cache_folder / "movies_cache.json"
-        self.failures_cache_path = self._get_failures_cache_path()
+        self.cache_folder.mkdir(parents=True, exist_ok=True)
+        self.failures_cache_path = self.cache_folder / KNOWN_FAILURES_FILENAME
+        # New failures are appended to the file as they happen; it is only rewritten at exit when it has
+        # gathered enough duplicates, or when an append failed and the file is missing IDs
+        self._failures_log_lock = threading.Lock()
+        self._failures_file_records = 0
+        self._failures_need_compact = False
+        # st_mtime_ns of the failures file as last read or written, so unchanged files aren't re-read
+        self._failures_file_mtime: Optional[int] = None
+        atexit.register(self._compact_known_failures)
+        atexit.register(self._shutdown_pools)
         self.status_file_path = self.cache_folder / STATUS_FILENAME
 
 
@@ -59,7 +108,8 @@ class MediaManager:
             yt_dlp_path=config["YT_DLP_PATH"]
         )
         self.asset_generator_service = AssetGeneratorService(
-            ffmpeg_path=config["FFMPEG_PATH"]
+            ffmpeg_path=config["FFMPEG_PATH"],
+            cache_folder=config["CACHE_FOLDER"],
         )
 
         self.library_fs_manager = FileSystemManager(
@@ -94,18 +144,25 @@ class MediaManager:
         if library is None:
             return
 
-        movies_to_download = []
-        for movie_id, data in library.items():
-            movie_path = Path(data['file_path'])
-            paths = self.library_fs_manager.get_movie_paths(movie_path.parent.name)
+        # Folder names are plain string slices; a Path is only built for movies that need a download
+        library_movies = [
+            (movie_id, data, os.path.basename(os.path.dirname(data['file_path']))) for movie_id, data in library.items()
+        ]
+        # Entries carrying a recorded has_trailer flag are trusted; older ones are answered from one walk
+        tree = self._snapshot_library_if(any('has_trailer' not in data for _, data, _ in library_movies))
 
-            if not paths.get_trailer_path():
+        movies_to_download = []
+        for movie_id, data, folder_name in library_movies:
+            has_trailer = data.get('has_trailer')
+            if has_trailer is None:
+                has_trailer = self._library_has_trailer(tree, os.path.dirname(data['file_path']))
+            if not has_trailer:
                 movies_to_download.append({
                     "id": int(movie_id),
                     "title": data['title'],
                     "release_date": f"{data['year']}-01-01",
-                    "local_folder_path": movie_path.parent,
-                    "local_folder_name": movie_path.parent.name
+                    "local_folder_path": Path(data['file_path']).parent,
+                    "local_folder_name": folder_name
                 })
 
         if not movies_to_download:
@@ -115,8 +172,17 @@ class MediaManager:
         logger.info(f"Found [bold blue]{len(movies_to_download)}[/bold blue] movies missing trailers.")
         self._load_known_failures()
 
+        rows_before = len(self.stats["downloads"])
         self._execute_download_pipeline(movies_to_download, self.library_fs_manager, create_assets=False)
-        self._save_known_failures()
+
+        downloaded = {folder for folder, ok, _ in self.stats["downloads"][rows_before:] if ok}
+        # Only the entries that gained a trailer are appended; the rest of the file stays as it is
+        updated = {
+            movie_id: {**library[movie_id], 'has_trailer': True}
+            for movie_id in (str(movie["id"]) for movie in movies_to_download if movie["local_folder_name"] in downloaded)
+        }
+        if updated:
+            self._append_library_entries(updated)
 
 
     def fetch_upcoming_movie_trailers(self):
@@ -140,41 +206,60 @@ class MediaManager:
         )
 
         self._execute_download_pipeline(movies_to_process, self.download_fs_manager, create_assets=True)
-        self._save_known_failures()
 
     def sync_trailers_with_library(self):
         logger.info("Syncing library cache with file system...")
         library = self._load_library_cache()
         if library is None:
             return
-        if not library:
-            logger.info("Library is empty. Nothing to sync.")
-            return
 
-        cache_deletions = []
-        trailer_deletions = []
+        # movie_id -> title; a dict keeps the cleanup filter's membership checks O(1)
+        cache_deletions: Dict[str, str] = {}
+        trailer_deletions: List[Path] = []
+        valid_movie_dirs = set()
+        trailer_flags: Dict[str, bool] = {}
+        total_movies = 0
+        # Every check below is answered from this one walk instead of a stat/glob per entry
+        tree = self.library_fs_manager.snapshot_files()
 
         logger.info("Checking for missing movie files...")
         for movie_id, data in library.items():
-            movie_path = Path(data.get('file_path', ''))
-            if not movie_path.exists():
+            total_movies += 1
+            file_path = data.get('file_path')
+            if file_path is None:
+                continue
+            movie_dir = os.path.dirname(file_path)
+            valid_movie_dirs.add(movie_dir)
+            names = tree.get(movie_dir)
+            exists = os.path.basename(file_path) in names if names is not None else os.path.exists(file_path)
+            if not exists:
                 logger.warning(f"  [yellow]Missing file for '{data['title']}'. Marking cache entry for removal.[/yellow]")
-                cache_deletions.append(movie_id)
+                cache_deletions[movie_id] = data['title']
+                continue
+            # The sync is the one place the recorded has_trailer flags get rebuilt from disk
+            has_trailer = self._library_has_trailer(tree, movie_dir)
+            if data.get('has_trailer') != has_trailer:
+                trailer_flags[movie_id] = has_trailer
+
+        if not total_movies:
+            logger.info("Library is empty. Nothing to sync.")
+            return
 
         logger.info("Checking for orphaned trailer files...")
-        all_trailers = list(self.library_fs_manager.download_folder.rglob(f"*{TRAILER_SUFFIX}.mp4"))
-        valid_movie_dirs = {Path(data['file_path']).parent for data in library.values() if 'file_path' in data}
-
-        for trailer_path in all_trailers:
-            if trailer_path.parent not in valid_movie_dirs:
-                logger.warning(f"  [yellow]Found orphaned trailer: '{trailer_path.name}'. Marking for deletion.[/yellow]")
-                trailer_deletions.append(trailer_path)
-
-        if not cache_deletions and not trailer_deletions:
+        trailer_name_suffix = f"{TRAILER_SUFFIX}.mp4"
+        for dir_path, names in tree.items():
+            if dir_path in valid_movie_dirs:
+                continue
+            for name in names:
+                if name.endswith(trailer_name_suffix):
+                    logger.warning(f"  [yellow]Found orphaned trailer: '{name}'. Marking for deletion.[/yellow]")
+                    trailer_deletions.append(Path(dir_path, name))
+
+        if not cache_deletions and not trailer_deletions and not trailer_flags:
             logger.info("[green]Library is already perfectly in sync![/green]")
             return
 
-        self._execute_sync_operations(cache_deletions, trailer_deletions, library)
+        self._execute_sync_operations(library, cache_deletions, trailer_deletions, trailer_flags)
 
     def show_library_status(self):
         logger.info("Gathering library status...")
@@ -183,13 +268,14 @@ class MediaManager:
         missing_trailers = 0
         library = self._load_library_cache()
 
-        if library:
-            total_movies = len(library)
-            for movie_id, data in library.items():
-                movie_path = Path(data['file_path'])
-                paths = self.library_fs_manager.get_movie_paths(movie_path.parent.name)
-                if not paths.get_trailer_path():
-                    missing_trailers += 1
+        library_entries = [(data.get('has_trailer'), os.path.dirname(data['file_path'])) for data in (library or {}).values()]
+        total_movies = len(library_entries)
+        if library_entries:
+            tree = self._snapshot_library_if(any(flag is None for flag, _ in library_entries))
+            missing_trailers = sum(
+                not (self._library_has_trailer(tree, movie_dir) if flag is None else flag)
+                for flag, movie_dir in library_entries
+            )
         else:
             logger.info("Run the Sanitizer [1] to build your library.")
 
@@ -201,19 +287,16 @@ class MediaManager:
             logger.warning(f"Could not scan download folder: {e}")
 
         last_cache_update_ts = 0
-        if self.library_cache_path.exists():
-            try:
-                last_cache_update_ts = self.library_cache_path.stat().st_mtime
-            except FileNotFoundError:
-                pass
+        try:
+            last_cache_update_ts = self.library_cache_path.stat().st_mtime
+        except FileNotFoundError:
+            pass
 
         last_run_ts = 0
-        if self.status_file_path.exists():
-            try:
-                with self.status_file_path.open("r", encoding="utf-8") as f:
-                    last_run_ts = json.load(f).get("last_run", 0)
-            except (json.JSONDecodeError, IOError, FileNotFoundError):
-                pass
+        try:
+            last_run_ts = read_json_file(self.status_file_path).get("last_run", 0)
+        except (json.JSONDecodeError, IOError):
+            pass
 
         self._load_known_failures()
         known_failures_count = len(self.known_failures)
@@ -225,8 +308,9 @@ class MediaManager:
         table.add_row("[bold cyan]Upcoming Trailers[/]", f"[white]{upcoming_trailers}[/]")
         table.add_row("[bold cyan]Known Failures[/]", f"[red]{known_failures_count}[/]")
         table.add_row("", "")
-        table.add_row("[bold cyan]Last Library Scan[/]", f"[white]{format_time_ago(last_cache_update_ts)}[/]")
-        table.add_row("[bold cyan]Last UMM Activity[/]", f"[white]{format_time_ago(last_run_ts)}[/]")
+        now = time.time()
+        table.add_row("[bold cyan]Last Library Scan[/]", f"[white]{format_time_ago(last_cache_update_ts, now)}[/]")
+        table.add_row("[bold cyan]Last UMM Activity[/]", f"[white]{format_time_ago(last_run_ts, now)}[/]")
 
         panel = Panel(
             Align.left(table),
@@ -274,20 +358,23 @@ class MediaManager:
 
         jobs = []
         try:
-            folders_to_scan = [p for p in self.download_path.iterdir() if p.is_dir()]
+            with os.scandir(self.download_path) as it:
+                folders_to_scan = [entry.name for entry in it if entry.is_dir(follow_symlinks=False)]
         except FileNotFoundError:
             logger.warning(f"Download folder not found. Nothing to scan.")
             return
 
-        for folder in folders_to_scan:
-            paths = self.download_fs_manager.get_movie_paths(folder.name)
+        for folder_name in folders_to_scan:
+            paths = self.download_fs_manager.get_movie_paths(folder_name)
+            # One listing per folder answers the trailer, placeholder and backdrop checks
+            file_names = paths.list_files()
 
-            if paths.get_trailer_path():
+            if paths.get_trailer_path(file_names):
                 # Only generate assets if a trailer exists
-                if not paths.placeholder.exists():
-                    jobs.append(("placeholder", paths, folder.name))
-                if self.cfg["CREATE_BACKDROP"] and not paths.backdrop.exists():
-                    jobs.append(("backdrop", paths, folder.name))
+                if paths.placeholder.name not in file_names:
+                    jobs.append(("placeholder", paths, folder_name))
+                if self.cfg["CREATE_BACKDROP"] and paths.backdrop.name not in file_names:
+                    jobs.append(("backdrop", paths, folder_name))
 
         if not jobs:
             logger.info("[green]All assets are already generated.[/green]")
@@ -310,16 +397,16 @@ class MediaManager:
     # --- NEW HELPER FUNCTION ---
     def _run_asset_generation(self, jobs: List[tuple]):
         logger.info(f"Generating [bold blue]{len(jobs)}[/bold blue] assets...")
-        ffmpeg_workers = self.cfg.get("MAX_FFMPEG_WORKERS", 4)
+        ff_pool = self._pool("FFmpeg", _capped_workers(self.cfg.get("MAX_FFMPEG_WORKERS"), DEFAULT_FFMPEG_WORKERS))
 
-        with ThreadPoolExecutor(max_workers=ffmpeg_workers, thread_name_prefix="FFmpeg") as ff_pool, \
-             Progress(
+        with Progress(
                 SpinnerColumn(),
                 TextColumn("[bold blue]{task.description}"),
                 BarColumn(bar_width=None),
                 "[progress.percentage]{task.percentage:>3.0f}%",
                 TimeRemainingColumn(),
                 transient=True,
+                refresh_per_second=PROGRESS_REFRESH_PER_SECOND,
                 console=self.console,
             ) as progress:
 
@@ -365,8 +452,16 @@ class MediaManager:
         self.console.print(Align.center(panel))
 
 
+    def _reload_config(self) -> Dict[str, Any]:
+        # If config.json was deleted since startup, load_config writes a default one; end the
+        # session the same way a first run does
+        try:
+            return load_config()
+        except FirstRunCreated:
+            sys.exit(0)
+
     def _edit_api_key(self):
-        config = load_config()
+        config = self._reload_config()
         current_key = config.get("TMDB_API_KEY", "NOT SET")
         self.console.print(f"Current TMDB API Key: [cyan]{current_key}[/cyan]")
         new_key = self.console.input("Enter new TMDB API Key (or press Enter to cancel): ").strip()
@@ -378,7 +473,7 @@ class MediaManager:
         time.sleep(1)
 
     def _edit_paths_setting(self):
-        config = load_config()
+        config = self._reload_config()
         current_library_path = config.get("MOVIE_LIBRARY")
         current_download_path = config.get("DOWNLOAD_FOLDER")
         current_cache_path = config.get("CACHE_FOLDER")
@@ -405,21 +500,21 @@ class MediaManager:
         time.sleep(2)
 
     def _edit_performance_settings(self):
-        config = load_config()
+        config = self._reload_config()
         current_dl = config.get("MAX_DOWNLOAD_WORKERS")
         current_ff = config.get("MAX_FFMPEG_WORKERS")
 
-        self.console.print(f"Current Download Workers: [cyan]{current_dl}[/cyan]")
-        new_dl = self.console.input("Enter new Download Workers (or press Enter to keep): ").strip()
+        self.console.print(f"Current Download Workers: [cyan]{current_dl or f'auto ({DEFAULT_DOWNLOAD_WORKERS})'}[/cyan]")
+        new_dl = self.console.input("Enter new Download Workers, 'auto', or press Enter to keep: ").strip().lower()
 
-        self.console.print(f"Current FFmpeg Workers: [cyan]{current_ff}[/cyan]")
-        new_ff = self.console.input("Enter new FFmpeg Workers (or press Enter to keep): ").strip()
+        self.console.print(f"Current FFmpeg Workers: [cyan]{current_ff or f'auto ({DEFAULT_FFMPEG_WORKERS})'}[/cyan]")
+        new_ff = self.console.input("Enter new FFmpeg Workers, 'auto', or press Enter to keep: ").strip().lower()
 
         try:
             if new_dl:
-                config["MAX_DOWNLOAD_WORKERS"] = int(new_dl)
+                config["MAX_DOWNLOAD_WORKERS"] = None if new_dl == "auto" else int(new_dl)
             if new_ff:
-                config["MAX_FFMPEG_WORKERS"] = int(new_ff)
+                config["MAX_FFMPEG_WORKERS"] = None if new_ff == "auto" else int(new_ff)
 
             if new_dl or new_ff:
                 save_config(config)
@@ -434,8 +529,10 @@ class MediaManager:
             self.console.clear()
 
             cache_text = Text.from_markup(
-                f"[bold green][1][/bold green] Clear Upcoming Movie Cache ([cyan]{self.tmdb_cache_path.name}[/cyan])\n"
-                f"[bold green][2][/bold green] Clear Junk Word Cache ([cyan]{self.junk_cache_path.name}[/cyan])\n"
+                f"[bold green][1][/bold green] Clear Upcoming Movie Cache ([cyan]{self.tmdb_cache_path.name}[/cyan], "
+                f"[cyan]{self.tmdb_service.trailer_keys_file.name}[/cyan])\n"
+                f"[bold green][2][/bold green] Clear Sanitizer Caches ([cyan]{self.junk_cache_path.name}[/cyan], "
+                f"[cyan]{self.tmdb_service.search_cache_file.name}[/cyan])\n"
                 f"[bold green][3][/bold green] Clear Known Failures Cache ([cyan]{self.failures_cache_path.name}[/cyan])\n"
                 f"[bold red][4][/bold red] Clear Movie Library Cache ([cyan]{self.library_cache_path.name}[/cyan])\n\n"
                 "[bold red][A][/bold red] Clear All Caches\n"
@@ -459,10 +556,12 @@ class MediaManager:
 
             if choice == "1":
                 self._safe_delete_cache(self.tmdb_cache_path, "Upcoming Movie Cache")
+                self.tmdb_service.clear_trailer_keys()
             elif choice == "2":
                 self._safe_delete_cache(self.junk_cache_path, "Junk Word Cache")
+                self.tmdb_service.clear_search_cache()
             elif choice == "3":
-                self._safe_delete_cache(self.failures_cache_path, "Known Failures Cache")
+                self._clear_known_failures()
             elif choice == "4":
                 self.console.print(f"[bold red]WARNING:[/] This will delete your main {self.library_cache_path.name}.")
                 self.console.print("You will need to re-run the Sanitizer to rebuild it.")
@@ -472,8 +571,10 @@ class MediaManager:
                 self.console.print("[bold red]WARNING: This will clear ALL caches.[/bold red]")
                 if self.console.input("Are you sure? (y/n): ").lower() == 'y':
                     self._safe_delete_cache(self.tmdb_cache_path, "Upcoming Movie Cache")
+                    self.tmdb_service.clear_trailer_keys()
                     self._safe_delete_cache(self.junk_cache_path, "Junk Word Cache")
-                    self._safe_delete_cache(self.failures_cache_path, "Known Failures Cache")
+                    self.tmdb_service.clear_search_cache()
+                    self._clear_known_failures()
                     self._safe_delete_cache(self.library_cache_path, "Movie Library Cache", warn=False)
             elif choice == "0":
                 break
@@ -491,51 +592,68 @@ class MediaManager:
             self.console.print(f"[red]Failed to delete {file_name}: {e}[/red]")
 
 
+    def _clear_known_failures(self):
+        # Drop the in-memory copy too, otherwise the exit compaction would write the IDs straight back
+        self._safe_delete_cache(self.failures_cache_path, "Known Failures Cache")
+        self.known_failures.clear()
+        self._known_failures_ro = frozenset()
+        self._failures_need_compact = False
+        self._failures_file_records = 0
+        self._failures_file_mtime = None
+
     # --- Library Cache Helpers ---
 
     def _load_library_cache(self) -> Optional[Dict[str, Dict]]:
-        if not self.library_cache_path.exists():
-            logger.warning("[yellow]Library cache ('library.json') not found. Run the sanitizer [1] first.[/yellow]")
-            return None
+        # None means there is no cache yet
+        migrate_json_to_jsonl(self.library_path / LEGACY_LIBRARY_FILENAME, self.library_cache_path)
         try:
-            with self.library_cache_path.open("r", encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            logger.error("[red]Could not parse library.json. It may be corrupt.[/red]")
+            return load_jsonl_dict(self.library_cache_path)
+        except FileNotFoundError:
+            logger.warning(f"[yellow]Library cache ('{self.library_cache_path.name}') not found. Run the sanitizer [1] first.[/yellow]")
             return None
 
+    def _append_library_entries(self, entries: Dict[str, Dict]):
+        try:
+            append_jsonl(self.library_cache_path, ({movie_id: data} for movie_id, data in entries.items()))
+        except OSError as e:
+            logger.error(f"Failed to update library cache: {e}")
+
     def _save_library_cache(self, cache: Dict):
         try:
-            with self.library_cache_path.open("w", encoding="utf-8") as f:
-                json.dump(cache, f, indent=4)
+            write_jsonl_dict(self.library_cache_path, cache)
             logger.info(f"💾 Library cache saved to [cyan]{self.library_cache_path}[/cyan]")
         except IOError as e:
             logger.error(f"Failed to save library cache: {e}")
 
-    # --- Sync Helpers ---
-
-    def _execute_sync_operations(self, cache_deletions, trailer_deletions, library):
+    def _execute_sync_operations(
+        self, library: Dict[str, Dict], cache_deletions: Dict[str, str], trailer_deletions: List[Path],
+        trailer_flags: Dict[str, bool],
+    ):
         if self.is_dry_run():
             logger.info("[bold yellow]DRY RUN MODE: The following sync operations are planned:[/bold yellow]")
-            for movie_id in cache_deletions:
-                title = library.get(movie_id, {}).get('title', 'Unknown')
+            for movie_id, title in cache_deletions.items():
                 logger.info(f"  [cyan]REMOVE CACHE:[/] Entry for '{title}' (ID: {movie_id})")
             for trailer_path in trailer_deletions:
                 logger.info(f"  [red]DELETE FILE:[/] Orphaned trailer '{trailer_path}'")
+            if trailer_flags:
+                logger.info(f"  [cyan]UPDATE CACHE:[/] Trailer status for {len(trailer_flags)} entries")
 
-                prompt_text = "\n[bold]Proceed with changes? (y/n): [/bold]"
-                width = self.console.width
-                padding = (width - len(prompt_text.strip().replace("[bold]", "").replace("[/bold]", ""))) // 2
+            prompt_text = "\n[bold]Proceed with changes? (y/n): [/bold]"
+            width = self.console.width
+            padding = (width - len(prompt_text.strip().replace("[bold]", "").replace("[/bold]", ""))) // 2
 
-                if self.console.input(" " * padding + prompt_text).strip().lower() == 'y':
-                    logger.info("Executing sync operations...")
-                self._run_sync_operations(cache_deletions, trailer_deletions, library)
+            if self.console.input(" " * padding + prompt_text).strip().lower() == 'y':
+                logger.info("Executing sync operations...")
+                self._run_sync_operations(library, cache_deletions, trailer_deletions, trailer_flags)
             else:
                 logger.info("Sync aborted by user.")
         else:
-            self._run_sync_operations(cache_deletions, trailer_deletions, library)
+            self._run_sync_operations(library, cache_deletions, trailer_deletions, trailer_flags)
 
-    def _run_sync_operations(self, cache_deletions, trailer_deletions, library):
+    def _run_sync_operations(
+        self, library: Dict[str, Dict], cache_deletions: Dict[str, str], trailer_deletions: List[Path],
+        trailer_flags: Dict[str, bool],
+    ):
         for trailer_path in trailer_deletions:
             try:
                 trailer_path.unlink()
@@ -543,53 +661,129 @@ class MediaManager:
             except OSError as e:
                 logger.error(f"  [red]FAILED to delete '{trailer_path}': {e}[/red]")
 
+        if cache_deletions or trailer_flags:
+            # A full rewrite rather than an append, so the sync also compacts lines left behind by earlier appends
+            for movie_id in cache_deletions:
+                del library[movie_id]
+            for movie_id, has_trailer in trailer_flags.items():
+                library[movie_id]['has_trailer'] = has_trailer
+            self._save_library_cache(library)
         if cache_deletions:
-            cleaned_library = {mid: data for mid, data in library.items() if mid not in cache_deletions}
-            self._save_library_cache(cleaned_library)
-            logger.info(f"  [green]CLEANED:[/] Removed {len(cache_deletions)} invalid entries from library.json.")
+            logger.info(f"  [green]CLEANED:[/] Removed {len(cache_deletions)} invalid entries from {self.library_cache_path.name}.")
 
     # --- Other Helpers ---
 
-    def _increment_failures(self):
-        with self.failure_lock:
-            self.failures += 1
-            if self.failures >= 5:
-                raise RuntimeError(
-                    "Too many download failures. Check network or YouTube availability."
-                )
+    def _increment_failures(self, counter: Iterator[int], abort: threading.Event):
+        # Exactly one caller draws the 5th number, so only the first crossing raises
+        if next(counter) == 5:
+            abort.set()
+            raise RuntimeError(
+                "Too many download failures. Check network or YouTube availability."
+            )
 
-    def _get_failures_cache_path(self) -> Path:
-        cache_folder = Path(self.cfg["CACHE_FOLDER"]).expanduser()
-        cache_folder.mkdir(parents=True, exist_ok=True)
-        return cache_folder / KNOWN_FAILURES_FILENAME
+    def _ensure_dir(self, path: Path):
+        # A racing worker may mkdir the same folder twice, which exist_ok already tolerates
+        key = str(path)
+        if key not in self._created_dirs:
+            path.mkdir(parents=True, exist_ok=True)
+            self._created_dirs.add(key)
+
+    def _tally_assets(self, futures: List[Future]):
+        # Counts what the finished _ffmpeg_task jobs created; cancelled or still running jobs are left out
+        for future in futures:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                key = future.result()
+                if key:
+                    self.stats[key] += 1
+
+    def _record_failure(self, movie_id: int):
+        batch = getattr(self._failure_local, "batch", None)
+        if batch is None:
+            # First failure on this thread: register its list (the only time the lock is taken)
+            batch = self._failure_local.batch = []
+            with self._failure_batches_lock:
+                self._failure_batches.append(batch)
+        batch.append(movie_id)
+        self._journal_failure(movie_id)
+
+    def _journal_failure(self, movie_id: int):
+        # One 4-byte append per failure, so an abort or crash mid-run doesn't lose the IDs found so far
+        with self._failures_log_lock:
+            try:
+                with self.failures_cache_path.open("ab") as f:
+                    f.write(array("I", [movie_id]).tobytes())
+                    self._failures_file_mtime = os.fstat(f.fileno()).st_mtime_ns
+                self._failures_file_records += 1
+            except OSError as e:
+                self._failures_need_compact = True
+                logger.warning(f"Could not append to known failures cache: {e}")
+
+    def _merge_recorded_failures(self):
+        # Only called once the worker pools have finished, so no thread is still appending
+        with self._failure_batches_lock:
+            for batch in self._failure_batches:
+                self.known_failures.update(batch)
+                batch.clear()
 
     def _load_known_failures(self):
         cache_path = self.failures_cache_path
-        if cache_path.exists():
+        try:
+            mtime = cache_path.stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime is not None and mtime != self._failures_file_mtime:
             try:
-                with cache_path.open("r", encoding="utf-8") as f:
-                    self.known_failures = set(json.load(f))
+                # The cache is a packed array of 32-bit movie IDs, so loading it is a single memcpy
+                data = cache_path.read_bytes()
+                failed_ids = array("I")
+                torn = len(data) % failed_ids.itemsize
+                if torn:
+                    # A crash mid-append left a partial ID at the end. Cut it off on disk too,
+                    # otherwise every later append would land misaligned behind it
+                    data = data[:-torn]
+                    os.truncate(cache_path, len(data))
+                    mtime = cache_path.stat().st_mtime_ns
+                failed_ids.frombytes(data)
+                # Merge rather than replace, so failures recorded this session survive a reload
+                self.known_failures.update(failed_ids)
+                self._failures_file_records = len(failed_ids)
+                self._failures_file_mtime = mtime
                 logger.info(
                     f"Loaded [bold yellow]{len(self.known_failures)}[/bold yellow] known failing movie IDs."
                 )
-            except (json.JSONDecodeError, IOError):
+            except (ValueError, IOError):
                 logger.warning(
                     "[yellow]Warning:[/] Known failures cache file is corrupt or unreadable."
                 )
-
-    def _save_known_failures(self):
-        if not self.known_failures:
+        self._known_failures_ro = frozenset(self.known_failures)
+
+    def _compact_known_failures(self):
+        # Folds the journal back into one sorted, duplicate-free file once duplicates make up a quarter of it
+        self._merge_recorded_failures()
+        if not self._failures_need_compact and (
+            len(self.known_failures) >= FAILURES_COMPACT_RATIO * self._failures_file_records
+        ):
             return
         cache_path = self.failures_cache_path
         try:
-            with cache_path.open("w", encoding="utf-8") as f:
-                json.dump(list(self.known_failures), f, indent=2)
+            atomic_write_bytes(cache_path, array("I", sorted(self.known_failures)).tobytes())
+            self._failures_need_compact = False
+            self._failures_file_records = len(self.known_failures)
+            self._failures_file_mtime = cache_path.stat().st_mtime_ns
             logger.info(
                 f"🟡 [yellow]Updated known failures cache with {len(self.known_failures)} movie IDs.[/yellow]"
             )
         except IOError as e:
             logger.error(f"Failed to write known failures cache: {e}")
 
+    def _snapshot_library_if(self, needed: bool) -> Dict[str, Set[str]]:
+        return self.library_fs_manager.snapshot_files() if needed else {}
+
+    def _library_has_trailer(self, tree: Dict[str, Set[str]], movie_dir: str) -> bool:
+        # Folders outside the snapshot (or no snapshot at all) fall back to globbing that one folder
+        paths = self.library_fs_manager.get_movie_paths(os.path.basename(movie_dir))
+        return paths.get_trailer_path(tree.get(movie_dir)) is not None
+
     def _filter_existing_movies(
         self, movies: List[Dict], year_start: int, year_end: int, fs_manager: FileSystemManager
     ) -> List[Dict]:
@@ -598,18 +792,27 @@ class MediaManager:
         )
         total_count = len(movies)
         movies_to_download = []
+        # One walk of the download folder, reduced to the folders that already hold a trailer, answers
+        # every check below with a set lookup; Path objects are only built for movies still to download
+        tree = fs_manager.snapshot_files()
+        self._created_dirs.update(tree)
+        marker = f"{TRAILER_SUFFIX}."
+        root = str(fs_manager.download_folder)
+        with_trailer = {
+            os.path.basename(folder) for folder, names in tree.items()
+            if os.path.dirname(folder) == root and any(marker in name for name in names)
+        }
         for movie in movies:
-            title = movie.get("title", "Unknown Title")
-            release_date = movie.get("release_date", "")
-
-            folder_name = fs_manager.prepare_movie_folder_name(title, release_date)
+            folder_name = fs_manager.prepare_movie_folder_name(
+                movie.get("title", "Unknown Title"), movie.get("release_date", "")
+            )
+            if folder_name in with_trailer:
+                continue
             paths = fs_manager.get_movie_paths(folder_name)
-
             movie["local_folder_name"] = folder_name
             movie["local_folder_path"] = paths.root
-
-            if not paths.get_trailer_path():
-                movies_to_download.append(movie)
+            self._paths_cache[(id(fs_manager), movie.get("id", 0))] = (folder_name, paths)
+            movies_to_download.append(movie)
 
         skipped_count = total_count - len(movies_to_download)
         log_message = f"Found {total_count} movies for {year_str}."
@@ -621,129 +824,275 @@ class MediaManager:
         return movies_to_download
 
     def _execute_download_pipeline(self, movies: list, fs_manager: FileSystemManager, create_assets: bool = False):
-        if not movies:
-            logger.info("No new trailers to download.")
-            return
-
-        if self.is_dry_run():
-            logger.info("[bold yellow]DRY RUN MODE: The following trailers are planned for download:[/bold yellow]")
-            for movie in movies:
-                title = movie.get("title", "Unknown Title")
-                folder_name = movie.get("local_folder_name", "Unknown")
-                folder_path = movie.get("local_folder_path", "Unknown")
-                trailer_path = folder_path / f"{folder_name}{TRAILER_SUFFIX}.mp4"
-                logger.info(f"  - [cyan]{title}[/cyan] -> {trailer_path.resolve()}")
+        # Drop the folders _filter_existing_movies seeded on every exit; they may be removed before the next run
+        try:
+            if not movies:
+                logger.info("No new trailers to download.")
+                return
+
+            if self.is_dry_run():
+                logger.info("[bold yellow]DRY RUN MODE: The following trailers are planned for download:[/bold yellow]")
+                for movie in movies:
+                    title = movie.get("title", "Unknown Title")
+                    folder_name = movie.get("local_folder_name", "Unknown")
+                    folder_path = movie.get("local_folder_path", "Unknown")
+                    trailer_path = folder_path / f"{folder_name}{TRAILER_SUFFIX}.mp4"
+                    logger.info(f"  - [cyan]{title}[/cyan] -> {trailer_path.resolve()}")
 
-            prompt_text = "\n[bold]Proceed with changes? (y/n): [/bold]"
-            width = self.console.width
-            padding = (width - len(prompt_text.strip().replace("[bold]", "").replace("[/bold]", ""))) // 2
+                prompt_text = "\n[bold]Proceed with changes? (y/n): [/bold]"
+                width = self.console.width
+                padding = (width - len(prompt_text.strip().replace("[bold]", "").replace("[/bold]", ""))) // 2
 
-            if self.console.input(" " * padding + prompt_text).strip().lower() == 'y':
-                logger.info("Executing downloads...")
-                self._process_movies_pipeline(movies, fs_manager, create_assets)
+                if self.console.input(" " * padding + prompt_text).strip().lower() == 'y':
+                    logger.info("Executing downloads...")
+                    self._process_movies_pipeline(movies, fs_manager, create_assets)
+                else:
+                    logger.info("Download aborted by user.")
             else:
-                logger.info("Download aborted by user.")
-        else:
-            self._process_movies_pipeline(movies, fs_manager, create_assets)
+                self._process_movies_pipeline(movies, fs_manager, create_assets)
+        finally:
+            self._created_dirs.clear()
 
     def _process_movies_pipeline(self, movies: list, fs_manager: FileSystemManager, create_assets: bool = False):
         if not movies:
             logger.info("No new movies to process.")
             return
 
-        download_workers = self.cfg.get("MAX_DOWNLOAD_WORKERS", 4)
-        ffmpeg_workers = self.cfg.get("MAX_FFMPEG_WORKERS", 4)
+        download_workers = _capped_workers(self.cfg.get("MAX_DOWNLOAD_WORKERS"), DEFAULT_DOWNLOAD_WORKERS)
+        ffmpeg_workers = _capped_workers(self.cfg.get("MAX_FFMPEG_WORKERS"), DEFAULT_FFMPEG_WORKERS)
         logger.info(
             f"Processing movies in parallel (Downloads: {download_workers}, Video Tasks: {ffmpeg_workers})"
         )
 
-        with ThreadPoolExecutor(
-            max_workers=download_workers, thread_name_prefix="Download"
-        ) as dl_pool, ThreadPoolExecutor(
-            max_workers=ffmpeg_workers, thread_name_prefix="FFmpeg"
-        ) as ff_pool, Progress(
+        self.stats["abort_reason"] = None
+        # Per run, so a batch outliving an abort can't touch the next one; next() on a count needs no lock
+        counter = count(1)
+        abort = threading.Event()
+        trailer_keys = self._prefetch_trailer_keys(movies)
+        downloadable = []
+        downloadable_ids = set()
+        settled_count = 0
+        for movie in movies:
+            movie_id = movie.get("id", 0)
+            # Known failures and keyless movies have nothing to download, so settle them here
+            # rather than handing them to the pool only to return straight away
+            if movie_id in downloadable_ids:
+                # A movie listed twice would download twice into the same trailer path
+                pass
+            elif movie_id in self._known_failures_ro:
+                self.stats["downloads"].append((movie.get("title", "Unknown Title"), False, "known failure"))
+            elif trailer_keys.get(movie_id):
+                downloadable.append(movie)
+                downloadable_ids.add(movie_id)
+                continue
+            else:
+                folder_name, _ = self._resolve_movie_paths(movie, fs_manager)
+                self._record_failure(movie_id)
+                self.stats["downloads"].append((folder_name, False, "no trailer key found"))
+            settled_count += 1
+
+        dl_pool = self._pool("Download", download_workers)
+        ff_pool = self._pool("FFmpeg", ffmpeg_workers)
+        # Asset jobs queued by the download workers, awaited before the run reports back
+        asset_futures: List[Future] = []
+        # Everything but the batch is the same for the whole run, so bind it once
+        run_batch = partial(
+            self._download_batch_task, trailer_keys=trailer_keys, ffmpeg_pool=ff_pool, fs_manager=fs_manager,
+            create_assets=create_assets, abort=abort, counter=counter, asset_futures=asset_futures,
+        )
+        with Progress(
             SpinnerColumn(),
             TextColumn("[bold blue]{task.description}"),
             BarColumn(bar_width=None),
             "[progress.percentage]{task.percentage:>3.0f}%",
             TimeRemainingColumn(),
             transient=True,
+            refresh_per_second=PROGRESS_REFRESH_PER_SECOND,
             console=self.console,
         ) as progress:
-            task_id = progress.add_task("Downloading trailers", total=len(movies))
-            download_futures = {
-                dl_pool.submit(self._download_task, movie, ff_pool, fs_manager, create_assets): movie
-                for movie in movies
-            }
+            task_id = progress.add_task("Downloading trailers", total=len(movies), completed=settled_count)
 
-            for future in as_completed(download_futures):
-                try:
-                    result = future.result()
-                    if result:
-                        self.stats["downloads"].append(result)
-                except RuntimeError as e:
-                    logger.info(f"⛔ [bold red]CRITICAL:[/] {e}")
-                    for f in download_futures:
-                        f.cancel()
+            # Small enough that every download worker still gets a batch
+            batch_size = max(1, min(DOWNLOAD_BATCH_SIZE, -(-len(downloadable) // download_workers)))
+            pending_batches = (
+                downloadable[i:i + batch_size] for i in range(0, len(downloadable), batch_size)
+            )
+            # A bounded window of futures rather than one per batch
+            max_in_flight = 2 * download_workers
+            in_flight: Dict[Future, List[Dict]] = {}
+            aborted = False
+
+            while not aborted:
+                for batch in islice(pending_batches, max_in_flight - len(in_flight)):
+                    in_flight[dl_pool.submit(run_batch, batch)] = batch
+                if not in_flight:
                     break
-                except Exception as e:
-                    movie = download_futures[future]
-                    logger.info(f"[bold red]Error processing '{movie.get('title')}':[/] {e}")
-                finally:
-                    progress.advance(task_id)
-
-            ff_pool.shutdown(wait=True)
-
-    def _download_task(self, movie: Dict, ffmpeg_pool: ThreadPoolExecutor, fs_manager: FileSystemManager, create_assets: bool = False) -> Dict:
-        movie_id = movie.get("id", 0)
-        title = movie.get("title", "Unknown Title")
-        result = {"folder": title, "downloaded": False, "reason": ""}
 
-        if movie_id in self.known_failures:
-            result["reason"] = "known failure"
-            return result
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                finished = 0
+                for future in done:
+                    batch = in_flight.pop(future)
+                    finished += len(batch)
+                    try:
+                        rows, abort_error = future.result()
+                    except Exception as e:
+                        titles = ", ".join(movie.get("title", "Unknown Title") for movie in batch)
+                        logger.info(f"[bold red]Error processing '{titles}':[/] {e}")
+                        continue
+                    self.stats["downloads"].extend(rows)
+                    if abort_error is not None:
+                        logger.info(f"⛔ [bold red]CRITICAL:[/] {abort_error}")
+                        self.stats["abort_reason"] = str(abort_error)
+                        aborted = True
+                # One update per wakeup rather than per future; wait() often hands back several at once
+                progress.advance(task_id, finished)
+
+            if aborted:
+                # Running batches stop at their next yt-dlp run; wait for them before merging or shutting down
+                for future in in_flight:
+                    future.cancel()
+                wait(in_flight)
+                for future, batch in in_flight.items():
+                    if future.cancelled():
+                        continue
+                    try:
+                        self.stats["downloads"].extend(future.result()[0])
+                    except Exception as e:
+                        titles = ", ".join(movie.get("title", "Unknown Title") for movie in batch)
+                        logger.info(f"[bold red]Error processing '{titles}':[/] {e}")
+                # Queued encodes are dropped with the pools, which are rebuilt on the next run
+                self._shutdown_pools(cancel=True)
+            else:
+                # Let the remaining encodes finish while the progress display is still up
+                wait(asset_futures)
+        self._tally_assets(asset_futures)
+
+        self._merge_recorded_failures()
+        self.tmdb_service.save_trailer_keys()
+
+    def _prefetch_trailer_keys(self, movies: list) -> Dict[int, Optional[str]]:
+        # TMDB lookups are pure round-trips, so a wide pool resolves them far faster than the download workers would
+        # Discover pages can list the same movie twice; look each ID up once
+        movie_ids = list(dict.fromkeys(m.get("id", 0) for m in movies if m.get("id", 0) not in self._known_failures_ro))
+        if not movie_ids:
+            return {}
+        pool = self._pool("TMDB", TMDB_PREFETCH_WORKERS)
+        return dict(zip(movie_ids, pool.map(self.tmdb_service.get_trailer_key, movie_ids)))
+
+    def _pool(self, name: str, workers: int) -> ThreadPoolExecutor:
+        pool, size = self._pools.get(name, (None, 0))
+        if pool is not None and size == workers:
+            return pool
+        if pool is not None:
+            pool.shutdown(wait=False)
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._pools[name] = (pool, workers)
+        return pool
+
+    def _shutdown_pools(self, cancel: bool = False):
+        for pool, _ in self._pools.values():
+            pool.shutdown(wait=not cancel, cancel_futures=cancel)
+        self._pools.clear()
+
+    def _resolve_movie_paths(self, movie: Dict, fs_manager: FileSystemManager) -> Tuple[str, MoviePaths]:
+        cached = self._paths_cache.get((id(fs_manager), movie.get("id", 0)))
+        if cached:
+            return cached
 
         folder_name = movie.get("local_folder_name")
         folder_path = movie.get("local_folder_path")
 
         if not folder_name or not folder_path:
-            folder_name = fs_manager.prepare_movie_folder_name(title, movie.get("release_date", ""))
+            folder_name = fs_manager.prepare_movie_folder_name(movie.get("title", "Unknown Title"), movie.get("release_date", ""))
             folder_path = fs_manager.download_folder / folder_name
 
         paths = fs_manager.get_movie_paths(folder_name)
         paths.root = folder_path
+        return folder_name, paths
+
+    def _download_batch_task(
+        self, batch: List[Dict], *, trailer_keys: Dict[int, Optional[str]], ffmpeg_pool: ThreadPoolExecutor,
+        fs_manager: FileSystemManager, create_assets: bool, abort: threading.Event, counter: Iterator[int],
+        asset_futures: List[Future],
+    ) -> Tuple[List[Tuple[str, bool, str]], Optional[RuntimeError]]:
+        # Returns one (folder, downloaded, reason) row per movie, and the error if this batch tripped the abort
+        resolve_paths = self._resolve_movie_paths
+        ensure_dir = self._ensure_dir
+        trailer_name = f"{TRAILER_SUFFIX}.%(ext)s"
+        rows = []
+        queued = []
+        for movie in batch:
+            movie_id = movie.get("id", 0)
+            title = movie.get("title", "Unknown Title")
 
-        result["folder"] = folder_name
-
-        trailer_key = self.tmdb_service.get_trailer_key(movie_id)
-        if not trailer_key:
-            self.known_failures.add(movie_id)
-            result["reason"] = "no trailer key found"
-            return result
-
-        paths.root.mkdir(parents=True, exist_ok=True)
-        out_template = str(paths.root / f"{folder_name}{TRAILER_SUFFIX}.%(ext)s")
-        download_ok = self.downloader_service.download_trailer(
-            youtube_key=trailer_key,
-            out_template=out_template,
-            title=title,
-            failure_callback=self._increment_failures,
-        )
-
-        if not download_ok:
-            self.known_failures.add(movie_id)
-            result["reason"] = "download failed"
-            return result
+            if abort.is_set():
+                rows.append((title, False, "aborted"))
+                continue
 
-        result["downloaded"] = True
+            folder_name, paths = resolve_paths(movie, fs_manager)
+            ensure_dir(paths.root)
+            # yt-dlp only needs a string, so join directly instead of building a Path to stringify
+            out_template = os.path.join(paths.root, folder_name + trailer_name)
+            queued.append((movie_id, title, folder_name, paths, trailer_keys[movie_id], out_template))
 
-        if create_assets:
-            ffmpeg_pool.submit(self._ffmpeg_task, "placeholder", paths, title)
-            if self.cfg["CREATE_BACKDROP"]:
-                ffmpeg_pool.submit(self._ffmpeg_task, "backdrop", paths, title)
-        return result
+        abort_error = None
 
-    def _ffmpeg_task(self, task_type: str, paths: MoviePaths, title: str):
+        def on_failure():
+            # Caught so the batch still reports and records every movie it tried
+            nonlocal abort_error
+            try:
+                self._increment_failures(counter, abort)
+            except RuntimeError as e:
+                abort_error = e
+
+        fetched = set()
+        exhausted = set()
+        if queued:
+            fetched = self.downloader_service.download_trailers_batch(
+                [(key, out_template, title) for _, title, _, _, key, out_template in queued],
+                # Outside the library, so a batch left behind by a crash is never scanned as movies
+                staging_root=self.cache_folder,
+            )
+            # Anything the batch run missed gets the usual retries and failure accounting
+            missed = [
+                (key, out_template, title) for _, title, _, _, key, out_template in queued
+                if out_template not in fetched
+            ]
+            if missed:
+                retried, exhausted = self.downloader_service.download_trailers(
+                    missed, failure_callback=on_failure,
+                    should_stop=abort.is_set,
+                )
+                fetched |= retried
+
+        submit = ffmpeg_pool.submit
+        ffmpeg_task = self._ffmpeg_task
+        create_backdrop = create_assets and self.cfg["CREATE_BACKDROP"]
+        for movie_id, title, folder_name, paths, key, out_template in queued:
+            if out_template not in fetched:
+                if out_template not in exhausted:
+                    # Cut short by an abort before every attempt was made; not a known failure
+                    rows.append((folder_name, False, "aborted"))
+                    continue
+                self._record_failure(movie_id)
+                # The key may point at a removed video; look it up afresh if this movie is ever retried
+                self.tmdb_service.forget_trailer_key(movie_id)
+                rows.append((folder_name, False, "download failed"))
+                continue
+
+            if create_assets:
+                asset_futures.append(submit(ffmpeg_task, "placeholder", paths, title, abort))
+                if create_backdrop:
+                    asset_futures.append(submit(ffmpeg_task, "backdrop", paths, title, abort))
+            rows.append((folder_name, True, ""))
+        return rows, abort_error
+
+    def _ffmpeg_task(
+        self, task_type: str, paths: MoviePaths, title: str, abort: Optional[threading.Event] = None
+    ) -> Optional[str]:
+        # Returns the stats key to count when an asset was created
+        if abort is not None and abort.is_set():
+            return None
         if task_type == "placeholder":
             ok = self.asset_generator_service.create_black_video(
                 paths.placeholder,
@@ -753,7 +1102,7 @@ class MediaManager:
             )
             if ok:
                 logger.info(f"   Created placeholder for {title}")
-                self.stats["placeholders"] += 1
+                return "placeholders"
         elif task_type == "backdrop":
             ok = self.asset_generator_service.create_backdrop_image(
                 paths.backdrop,
@@ -762,4 +1111,5 @@ class MediaManager:
             )
             if ok:
                 logger.info(f"   Created backdrop for {title}")
-                self.stats["backdrops"] += 1
\ No newline at end of file
+                return "backdrops"
+        return None
\ No newline at end of file
@@ -1,34 +1,77 @@
 import logging
+import os
+import shutil
+import threading
 from pathlib import Path
+from typing import Dict, Optional, Sequence
 
 from utils import run_subprocess
 
 logger = logging.getLogger("media_manager")
 
+BLACK_VIDEO_CODEC_ARGS = ("-c:v", "libx264", "-pix_fmt", "yuv420p")
+BACKDROP_IMAGE_ARGS = ("-vframes", "1", "-q:v", "2")
+
 class AssetGeneratorService:
 
-    def __init__(self, ffmpeg_path: str):
+    def __init__(self, ffmpeg_path: str, cache_folder: str):
         self.ffmpeg_path = ffmpeg_path
+        # Every placeholder/backdrop of a given size is identical, so ffmpeg renders each one once into
+        # the cache and movies get a hard link (or a copy) of it
+        self.template_folder = Path(cache_folder).expanduser()
+        self._template_lock = threading.Lock()
+        # Templates known to be on disk, so every movie after the first skips the lock and the stat
+        self._templates: Dict[str, Path] = {}
 
     def create_black_video(self, out_path: Path, duration: int, resolution: str, overwrite: bool) -> bool:
-        out_path.parent.mkdir(parents=True, exist_ok=True)
-        cmd = [
-            self.ffmpeg_path,
-            "-y" if overwrite else "-n",
-            "-f", "lavfi", "-i", f"color=c=black:s={resolution}:r=30",
-            "-t", str(duration), "-c:v", "libx264", "-pix_fmt", "yuv420p",
-            "-loglevel", "error", str(out_path)
-        ]
-        ok, _, _ = run_subprocess(cmd)
-        return ok
+        template = self._template(
+            f"_tpl_black_{resolution}_{duration}.mp4",
+            ("-f", "lavfi", "-i", f"color=c=black:s={resolution}:r=30", "-t", str(duration), *BLACK_VIDEO_CODEC_ARGS),
+        )
+        return template is not None and self._place(template, out_path, overwrite)
 
     def create_backdrop_image(self, out_path: Path, resolution: str, overwrite: bool) -> bool:
+        template = self._template(
+            f"_tpl_backdrop_{resolution}.jpg",
+            ("-f", "lavfi", "-i", f"color=c=black:s={resolution}", *BACKDROP_IMAGE_ARGS),
+        )
+        return template is not None and self._place(template, out_path, overwrite)
+
+    def _template(self, name: str, ffmpeg_args: Sequence[str]) -> Optional[Path]:
+        template = self._templates.get(name)
+        if template is not None:
+            return template
+        template = self.template_folder / name
+        # The lock keeps parallel FFmpeg workers from all rendering the same missing template
+        with self._template_lock:
+            if template.exists():
+                self._templates[name] = template
+                return template
+            self.template_folder.mkdir(parents=True, exist_ok=True)
+            partial = template.with_name(f"{template.stem}.part{template.suffix}")
+            cmd = [self.ffmpeg_path, "-y", *ffmpeg_args, "-loglevel", "error", str(partial)]
+            ok, _, _ = run_subprocess(cmd, capture=False)
+            if not ok:
+                return None
+            os.replace(partial, template)
+            self._templates[name] = template
+            return template
+
+    def _place(self, template: Path, out_path: Path, overwrite: bool) -> bool:
         out_path.parent.mkdir(parents=True, exist_ok=True)
-        cmd = [
-            self.ffmpeg_path,
-            "-y" if overwrite else "-n",
-            "-f", "lavfi", "-i", f"color=c=black:s={resolution}",
-            "-vframes", "1", "-q:v", "2", "-loglevel", "error", str(out_path)
-        ]
-        ok, _, _ = run_subprocess(cmd)
-        return ok
\ No newline at end of file
+        try:
+            if overwrite:
+                out_path.unlink(missing_ok=True)
+            elif out_path.exists():
+                return False
+            try:
+                os.link(template, out_path)
+            except OSError:
+                # Cross-device or no hard link support
+                shutil.copyfile(template, out_path)
+            return True
+        except OSError as e:
+            # The template may have been deleted under us; the next movie renders it again
+            self._templates.pop(template.name, None)
+            logger.warning(f"Could not create '{out_path}': {e}")
+            return False
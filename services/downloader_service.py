@@ -1,43 +1,121 @@
 import logging
+import os
+import random
+import shutil
+import tempfile
 import time
-from typing import Callable
+from pathlib import Path
+from typing import Callable, List, Set, Tuple
 
-from utils import run_subprocess
+from utils import move_path, run_subprocess
 
 logger = logging.getLogger("media_manager")
 
+DOWNLOAD_ATTEMPTS = 3
+
 class DownloaderService:
 
     def __init__(self, yt_dlp_path: str):
         self.yt_dlp_path = yt_dlp_path
 
-    def download_trailer(self, youtube_key: str, out_template: str, title: str, failure_callback: Callable) -> bool:
-        url = f"https://www.youtube.com/watch?v={youtube_key}"
-        for attempt in range(1, 4):
-            cmd = [
-                self.yt_dlp_path,
+    def _base_cmd(self) -> List[str]:
+        return [
+            self.yt_dlp_path,
+
+            # "--downloader", "aria2c" <--- User may use aria2c to maximize speed, just make sure to have it installed with yt-dlp
 
-                # "--downloader", "aria2c" <--- User may use aria2c to maximize speed, just make sure to have it installed with yt-dlp
+            "--sponsorblock-remove", "interaction,outro",
+            "--quiet",
+            "-f", "bestvideo[height<=1080]+bestaudio/best",
+            "--merge-output-format", "mp4",
+        ]
 
-                "--sponsorblock-remove", "interaction,outro",
-                "--quiet",
-                "-f", "bestvideo[height<=1080]+bestaudio/best",
-                "--merge-output-format", "mp4",
-                "-o", out_template, url
+    def download_trailers_batch(self, items: List[Tuple[str, str, str]], staging_root: Path) -> Set[str]:
+        # items are (youtube_key, out_template, title). One yt-dlp process fetches them all into a staging
+        # folder named by video ID, then each file is moved to its movie's template. Returns the templates
+        # that were filled; callers retry the rest one by one with download_trailers
+        staging_root.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix=".umm-batch-", dir=staging_root) as staging:
+            cmd = self._base_cmd() + [
+                "--ignore-errors",
+                "-o", os.path.join(staging, "%(id)s.%(ext)s"),
+                *(f"https://www.youtube.com/watch?v={key}" for key in dict.fromkeys(key for key, _, _ in items)),
             ]
-            ok, _, stderr = run_subprocess(cmd)
-
-            if ok:
-                logger.info(f"💾 Downloaded successfully: [cyan]{title}[/cyan] [dim]{url}[/]")
-                return True
-
-            if attempt < 3:
-                wait_time = attempt * 2
-                logger.warning(f"[yellow]Warning:[/] Download failed (attempt {attempt}/3) for [cyan]{title}[/cyan]. Retrying in {wait_time}s...")
-                if stderr:
-                    logger.info(f"[dim yellow]Reason: {stderr.strip().splitlines()[-1]}[/dim yellow]")
-                time.sleep(wait_time)
-
-        logger.info(f"🔴[bold red] Failed to download trailer after 3 attempts: {title}[/bold red]")
-        failure_callback()
-        return False
\ No newline at end of file
+            # Any unavailable video makes the run exit non-zero; the per-trailer retries report it
+            run_subprocess(cmd, capture=False, log_failure=False)
+
+            # Unfinished downloads (.part/.ytdl) never match: IDs contain no dots, so only key.ext does
+            fetched = {}
+            for name in os.listdir(staging):
+                key, _, ext = name.partition(".")
+                if ext and "." not in ext:
+                    fetched[key] = name
+
+            done = set()
+            placed = {}
+            for key, out_template, title in items:
+                name = fetched.get(key)
+                if name is None:
+                    continue
+                dest = out_template.replace("%(ext)s", name.partition(".")[2])
+                try:
+                    # The movie folder may have been removed since it was created or snapshotted
+                    os.makedirs(os.path.dirname(dest), exist_ok=True)
+                    if key not in placed:
+                        move_path(os.path.join(staging, name), dest)
+                        placed[key] = dest
+                    elif dest != placed[key]:
+                        # Movies sharing a trailer each get their own copy of it
+                        shutil.copyfile(placed[key], dest)
+                except OSError as e:
+                    # Left out of done, so the per-trailer retries handle it
+                    logger.warning(f"Could not place trailer for [cyan]{title}[/cyan]: {e}")
+                    continue
+                logger.info(f"💾 Downloaded successfully: [cyan]{title}[/cyan] [dim]https://www.youtube.com/watch?v={key}[/]")
+                done.add(out_template)
+        return done
+
+    def download_trailers(
+        self, items: List[Tuple[str, str, str]], failure_callback: Callable,
+        should_stop: Callable[[], bool] = lambda: False,
+    ) -> Tuple[Set[str], Set[str]]:
+        # Same items as download_trailers_batch, fetched one yt-dlp run per trailer. Retries go in rounds, so
+        # the whole set shares one backoff sleep per round instead of each trailer sleeping in turn.
+        # should_stop is polled before every run so an aborted pipeline doesn't keep retrying in the background.
+        # Returns (done, exhausted) templates; after a stop, items in neither were not given every attempt
+        pending = items
+        done = set()
+        exhausted = set()
+        for attempt in range(1, DOWNLOAD_ATTEMPTS + 1):
+            failed = []
+            for key, out_template, title in pending:
+                if should_stop():
+                    return done, exhausted
+                url = f"https://www.youtube.com/watch?v={key}"
+                ok, _, stderr = run_subprocess(self._base_cmd() + ["-o", out_template, url])
+
+                if ok:
+                    logger.info(f"💾 Downloaded successfully: [cyan]{title}[/cyan] [dim]{url}[/]")
+                    done.add(out_template)
+                    continue
+
+                failed.append((key, out_template, title))
+                if attempt < DOWNLOAD_ATTEMPTS:
+                    logger.warning(f"[yellow]Warning:[/] Download failed (attempt {attempt}/{DOWNLOAD_ATTEMPTS}) for [cyan]{title}[/cyan]. Retrying...")
+                    if stderr:
+                        logger.info(f"[dim yellow]Reason: {stderr.strip().splitlines()[-1]}[/dim yellow]")
+
+            pending = failed
+            if not pending:
+                break
+            if attempt < DOWNLOAD_ATTEMPTS:
+                # Exponential backoff with jitter, so workers throttled together don't all retry in lockstep
+                time.sleep(2 ** attempt * random.uniform(0.5, 1.0))
+
+        if should_stop():
+            return done, exhausted
+        for _, out_template, title in pending:
+            logger.info(f"🔴[bold red] Failed to download trailer after {DOWNLOAD_ATTEMPTS} attempts: {title}[/bold red]")
+            exhausted.add(out_template)
+            failure_callback()
+        return done, exhausted
@@ -2,26 +2,116 @@
 import logging
 import os
 import re
-from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Set, Tuple
 
 from config import BACKDROP_FILENAME, TRAILER_SUFFIX
 
 logger = logging.getLogger("media_manager")
 
+NORMALIZED_RE = re.compile(r'^.+\s\(\d{4}\)$')
+ILLEGAL_CHARS = '<>:"/\\|?*'
+ILLEGAL_CHARS_TRANS = str.maketrans(ILLEGAL_CHARS, " " * len(ILLEGAL_CHARS))
+# Directory reads mostly wait on the disk (or the network share), so a few threads hide that latency
+SCAN_WORKERS = 16
 
-@dataclass
+
+@dataclass(slots=True)
 class MoviePaths:
     root: Path
     placeholder: Path
     backdrop: Path
+    # First trailer found on disk. Only hits are kept, since a missing trailer may be downloaded later
+    _trailer: Optional[Path] = field(default=None, init=False, repr=False, compare=False)
+
+    def get_trailer_path(self, file_names: Optional[Set[str]] = None) -> Optional[Path]:
+        marker = f"{TRAILER_SUFFIX}."
+        # Pass the folder's already-listed file names to match in memory instead of reading the disk
+        if file_names is not None:
+            return next((self.root / name for name in file_names if marker in name), None)
+        if self._trailer is None:
+            try:
+                with os.scandir(self.root) as it:
+                    self._trailer = next((Path(entry.path) for entry in it if marker in entry.name), None)
+            except OSError:
+                return None
+        return self._trailer
+
+    def list_files(self) -> Set[str]:
+        try:
+            with os.scandir(self.root) as it:
+                return {entry.name for entry in it}
+        except OSError:
+            return set()
+
 
-    def get_trailer_path(self) -> Optional[Path]:
+def _walk_files(dir_path: str, suffixes: Tuple[str, ...]) -> List[str]:
+    found = []
+    stack = [dir_path]
+    while stack:
         try:
-            return next(self.root.glob(f"*{TRAILER_SUFFIX}.*"))
-        except StopIteration:
-            return None
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.lower().endswith(suffixes) and entry.is_file():
+                        found.append(entry.path)
+        except OSError:
+            continue
+    return found
+
+
+def find_files(root: Path, extensions: Set[str]) -> List[str]:
+    # Recursive search for files with the given (lowercase) suffixes. Each top-level folder is walked by its
+    # own worker, since a library is mostly one folder per movie and every scandir is a blocking round-trip.
+    # Returns plain path strings; callers build a Path only for the files they keep
+    # endswith() takes a tuple and checks every suffix in one call, with no splitext per entry
+    suffixes = tuple(extensions)
+    files: List[str] = []
+    top_dirs = []
+    try:
+        with os.scandir(root) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    top_dirs.append(entry.path)
+                elif entry.name.lower().endswith(suffixes) and entry.is_file():
+                    files.append(entry.path)
+    except OSError:
+        return files
+    if top_dirs:
+        with ThreadPoolExecutor(max_workers=min(SCAN_WORKERS, len(top_dirs)), thread_name_prefix="Scan") as pool:
+            for found in pool.map(_walk_files, top_dirs, [suffixes] * len(top_dirs)):
+                files.extend(found)
+    return files
+
+
+@lru_cache(maxsize=8192)
+def is_normalized_filename(filename_stem: str) -> bool:
+    # Checks if a filename matches the 'Title (Year)' format. The junk scan and the sanitizer both check
+    # every stem in the library, so answers are memoized
+    # Most messy names fail on the last character, so plain string checks reject them before the regex
+    if not filename_stem.endswith(")") or filename_stem[-6:-5] != "(":
+        return False
+    return NORMALIZED_RE.match(filename_stem) is not None
+
+
+@lru_cache(maxsize=4096)
+def _movie_folder_name(title: str, release_date: str) -> str:
+    # Pure function of its inputs, and the same movie is named several times per run, so it is memoized
+    year_str = release_date[:4] if release_date and len(release_date) >= 4 else "N/A"
+    folder_name = f"{title} ({year_str})"
+
+    # --- THIS IS THE FIX ---
+    # 1. Replace every illegal character with a space.
+    folder_name = folder_name.translate(ILLEGAL_CHARS_TRANS)
+    # 2. "Squeeze" all whitespace runs down to a single space.
+    folder_name = " ".join(folder_name.split())
+
+    return folder_name
 
 
 class FileSystemManager:
@@ -38,17 +128,27 @@ class FileSystemManager:
             backdrop=movie_folder / BACKDROP_FILENAME
         )
 
-    def prepare_movie_folder_name(self, title: str, release_date: str) -> str:
-        year_str = release_date[:4] if release_date and len(release_date) >= 4 else "N/A"
-        folder_name = f"{title} ({year_str})"
+    def snapshot_files(self) -> Dict[str, Set[str]]:
+        # One scandir walk of the whole tree: directory path -> names of the files directly inside it.
+        # Lets callers answer exists/trailer questions from memory instead of a stat or glob per movie
+        tree: Dict[str, Set[str]] = {}
+        stack = deque([str(self.download_folder)])
+        while stack:
+            dir_path = stack.pop()
+            names = tree[dir_path] = set()
+            try:
+                with os.scandir(dir_path) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file():
+                            names.add(entry.name)
+            except OSError:
+                continue
+        return tree
 
-        # --- THIS IS THE FIX ---
-        # 1. Replace all illegal characters with a single space.
-        folder_name = re.sub(r'[<>:"/\\|?*]+', ' ', folder_name)
-        # 2. "Squeeze" all multi-space sequences down to a single space.
-        folder_name = re.sub(r'\s+', ' ', folder_name).strip()
-
-        return folder_name
+    def prepare_movie_folder_name(self, title: str, release_date: str) -> str:
+        return _movie_folder_name(title, release_date)
 
     def clean_empty_folders(self, dry_run: bool):
         removed_count = 0
@@ -56,15 +156,41 @@ class FileSystemManager:
             return
 
         logger.info(f"Scanning for empty folders in '[cyan]{self.download_folder}[/cyan]'...")
-        for dirpath, dirnames, filenames in os.walk(self.download_folder, topdown=False):
-            if not dirnames and not filenames:
-                try:
-                    if dry_run:
-                        logger.info(f"[yellow]Dry Run:[/] Would remove empty folder: [cyan]{dirpath}[/cyan]")
-                    else:
-                        os.rmdir(dirpath)
-                    removed_count += 1
-                except OSError as e:
-                    logger.warning(f"[yellow]Warning:[/] Could not remove folder '[cyan]{dirpath}[/cyan]': {e}")
-
-        logger.info(f"Removed [bold blue]{removed_count}[/bold blue] empty folders.")
\ No newline at end of file
+        # One scandir per folder, reading only entry types: folder -> its subfolders, for those holding no files
+        root = str(self.download_folder)
+        subdirs: Dict[str, List[str]] = {}
+        stack = [root]
+        while stack:
+            dir_path = stack.pop()
+            children = []
+            has_files = False
+            try:
+                with os.scandir(dir_path) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            children.append(entry.path)
+                        else:
+                            has_files = True
+            except OSError:
+                continue
+            stack.extend(children)
+            if not has_files:
+                subdirs[dir_path] = children
+
+        # Children come after their parent in the walk, so the reverse visits them first, and a folder
+        # whose subfolders all turned out empty is removed as well. The download folder itself stays
+        removed = set()
+        for dir_path in reversed(list(subdirs)):
+            if dir_path == root or not all(child in removed for child in subdirs[dir_path]):
+                continue
+            try:
+                if dry_run:
+                    logger.info(f"[yellow]Dry Run:[/] Would remove empty folder: [cyan]{dir_path}[/cyan]")
+                else:
+                    os.rmdir(dir_path)
+                removed.add(dir_path)
+                removed_count += 1
+            except OSError as e:
+                logger.warning(f"[yellow]Warning:[/] Could not remove folder '[cyan]{dir_path}[/cyan]': {e}")
+
+        logger.info(f"Removed [bold blue]{removed_count}[/bold blue] empty folders.")
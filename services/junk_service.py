@@ -1,68 +1,74 @@
 import json
 import logging
-import re
+import os
 from collections import Counter
 from pathlib import Path
-from typing import List, Set
+from typing import Iterator, Optional, Set
+
+from services.file_system_manager import find_files, is_normalized_filename
+from utils import atomic_write_bytes, json_dumps, read_json_file
 
 logger = logging.getLogger("media_manager")
 
+SEPARATORS = "._[]()-"
+SEPARATORS_TRANS = str.maketrans(SEPARATORS, " " * len(SEPARATORS))
+
 class JunkService:
     def __init__(self, cache_folder: str, video_extensions: Set[str], library_folder: Path):
         self.cache_path = Path(cache_folder).expanduser() / "junk_cache.json"
         self.video_extensions = video_extensions
         self.library_folder = library_folder # Renamed from download_folder
+        # Last junk set read or written, with the cache file's st_mtime_ns at that point, so repeated
+        # sanitizer runs skip re-parsing a file that hasn't changed
+        self._junk_memo: Optional[frozenset] = None
+        self._junk_memo_mtime: Optional[int] = None
 
-    def _is_normalized_filename(self, filename_stem: str) -> bool:
-        # Checks if a filename matches the 'Title (Year)' format
-        return bool(re.search(r'^.+\s\(\d{4}\)$', filename_stem))
-
-    def _scan_for_videos(self) -> List[Path]:
-        # Scans the movie library for all video files
-        return [
-            p for p in self.library_folder.rglob("*") # Use library_folder
-            if p.is_file() and p.suffix.lower() in self.video_extensions
-        ]
-
-    def _tokenize_filename(self, filename: str) -> List[str]:
-        # Breaks a filename down into a list of potential junk words (tokens)
-        name = Path(filename).stem
-        name = re.sub(r"[\._\[\]\(\)-]", " ", name)
-        tokens = [token.lower() for token in name.split()]
-        return [token for token in tokens if len(token) > 2 and not token.isdigit()]
+    def _tokenize_filename(self, filename: str) -> Iterator[str]:
+        # Breaks a filename down into potential junk words (tokens)
+        name = os.path.splitext(filename)[0]
+        name = name.translate(SEPARATORS_TRANS)
+        for token in name.split():
+            if len(token) > 2 and not token.isdigit():
+                yield token.lower()
 
 
     def build_junk_cache(self, force_rebuild: bool = False) -> Set[str]:
         # Analyzes ONLY unnormalized video filenames to dynamically build a set of common junk words.
-        if not force_rebuild and self.cache_path.exists():
+        if not force_rebuild:
             try:
-                with self.cache_path.open("r", encoding="utf-8") as f:
-                    return set(json.load(f))
+                mtime = self.cache_path.stat().st_mtime_ns
+                if self._junk_memo is None or mtime != self._junk_memo_mtime:
+                    self._junk_memo = frozenset(read_json_file(self.cache_path))
+                    self._junk_memo_mtime = mtime
+                return set(self._junk_memo)
+            except FileNotFoundError:
+                pass
             except (json.JSONDecodeError, IOError):
                 logger.warning("[yellow]Junk cache is corrupt. Rebuilding.[/yellow]")
 
         logger.info("Building junk word cache from library filenames...")
-        video_files = self._scan_for_videos()
+        video_files = find_files(self.library_folder, self.video_extensions)
 
         if len(video_files) < 10:
             logger.info("Library is too small to build a reliable junk cache. Using default patterns.")
             return set()
 
-        all_tokens = []
+        # Counted per file as we go, so a large library never builds one list of every token
+        token_counts = Counter()
         unnormalized_file_count = 0
         for file_path in video_files:
-            if self._is_normalized_filename(file_path.stem):
+            # Only the file name matters here, so stay with string operations rather than building Paths
+            file_name = os.path.basename(file_path)
+            if is_normalized_filename(os.path.splitext(file_name)[0]):
                 continue
 
             unnormalized_file_count += 1
-            unique_tokens_per_file = set(self._tokenize_filename(file_path.name))
-            all_tokens.extend(list(unique_tokens_per_file))
+            token_counts.update(set(self._tokenize_filename(file_name)))
 
         if unnormalized_file_count < 5:
             logger.info(f"Not enough unnormalized files ({unnormalized_file_count}) to build a reliable junk cache.")
             return set()
 
-        token_counts = Counter(all_tokens)
         junk_words = set()
 
         junk_threshold = unnormalized_file_count * 0.2
@@ -73,8 +79,9 @@ class JunkService:
         if junk_words:
             logger.info(f"Identified {len(junk_words)} common junk words from {unnormalized_file_count} files (e.g., {list(junk_words)[:3]}). Saving to cache.")
             try:
-                with self.cache_path.open("w", encoding="utf-8") as f:
-                    json.dump(list(junk_words), f, indent=2)
+                atomic_write_bytes(self.cache_path, json_dumps(sorted(junk_words), indent=True))
+                self._junk_memo = frozenset(junk_words)
+                self._junk_memo_mtime = self.cache_path.stat().st_mtime_ns
             except IOError as e:
                 logger.error(f"Failed to save junk cache: {e}")
         else:
@@ -1,19 +1,46 @@
-import json
 import logging
+import os
 import re
-import shutil
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Callable, List, Dict, Optional, Tuple, Set
 
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeRemainingColumn
 
-from services.file_system_manager import FileSystemManager
+from services.file_system_manager import FileSystemManager, find_files, is_normalized_filename
 from services.tmdb_service import TMDbService
 from services.junk_service import JunkService
+from config import LEGACY_LIBRARY_FILENAME, LIBRARY_FILENAME
+from utils import append_jsonl, load_jsonl_dict, migrate_json_to_jsonl, move_path
 
 logger = logging.getLogger("media_manager")
 
+NORMALIZED_PARTS_RE = re.compile(r'^(.*?)\s\((\d{4})\)$')
+YEAR_RE = re.compile(r"\b(19\d{2}|20\d{2})\b")
+# Anything but whitespace and the separators . _ [ ] ( ) -; a token is a run of these
+TOKEN_CHAR = r"[^\s\._\[\]\(\)-]"
+TOKEN_RE = re.compile(f"{TOKEN_CHAR}+")
+# Rich repaints on its own timer; a few frames a second is plenty for bars that advance per file
+PROGRESS_REFRESH_PER_SECOND = 4
+# TMDB searches in flight at once while cataloging; well under TMDB's request rate limit
+SEARCH_WORKERS = 8
+DEFAULT_JUNK_WORDS = frozenset({'4k', '1080p', '720p', 'uhd', 'bluray', 'web-dl', 'webrip', 'x264', 'x265', 'hevc'})
+JUNK_TITLES = frozenset({
+    "sample", "video sample", "deleted scenes", "featurette",
+    "nostalgia", "wanderlust"
+})
+
+
+def _junk_pattern(junk_words: Set[str]) -> re.Pattern:
+    # One alternation of every junk word plus bare years, matched only where a token starts and ends.
+    # The lookarounds stand in for \b, which would treat "_" as part of a word; multi-token junk such
+    # as "web-dl" matches as written
+    alternatives = [re.escape(word) for word in sorted(junk_words, key=len, reverse=True)]
+    alternatives.append(r"(?:19|20)\d{2}")
+    return re.compile(f"(?<!{TOKEN_CHAR})(?:{'|'.join(alternatives)})(?!{TOKEN_CHAR})", re.IGNORECASE)
+
 
 class SanitizerService:
     def __init__(
@@ -30,113 +57,126 @@ class SanitizerService:
         self.console = console
         self.is_dry_run = is_dry_run
         self.video_extensions = {".mkv", ".mp4", ".avi", ".mov", ".wmv", ".flv"}
-        self.library_cache_path = self.fs_manager.download_folder / "library.json"
-
-        self.junk_titles = {
-            "sample", "video sample", "deleted scenes", "featurette",
-            "nostalgia", "wanderlust"
-        }
-
-    def _is_normalized_filename(self, filename_stem: str) -> bool:
-        # Checks if a filename matches the 'Title (Year)' format.
-        return bool(re.search(r'^.+\s\(\d{4}\)$', filename_stem))
+        self.library_cache_path = self.fs_manager.download_folder / LIBRARY_FILENAME
+        # The cache as of the last load or append, with the file's st_mtime_ns at that point. Repeated
+        # runs in one session reuse it unless something else (fetch, sync) has written the file since
+        self._library_cache: Optional[Dict[str, Dict]] = None
+        self._library_cache_mtime: Optional[int] = None
 
     def _parse_normalized_filename(self, filename_stem: str) -> Optional[Tuple[str, int]]:
         # Extracts title and year from a *clean* 'Title (Year)' string.
-        match = re.search(r'^(.*?)\s\((\d{4})\)$', filename_stem)
+        match = NORMALIZED_PARTS_RE.match(filename_stem)
         if match:
             title = match.group(1)
             year = int(match.group(2))
             return title, year
         return None
 
-    def _parse_filename(self, filename: str, junk_words: Set[str]) -> Optional[Tuple[str, Optional[int]]]:
+    def _parse_filename(self, filename: str, junk_re: re.Pattern) -> Optional[Tuple[str, Optional[int]]]:
         # Cleans and extracts a title and year from a *messy* filename.
-        clean_name = Path(filename).stem
-        year_match = re.search(r"\b(19\d{2}|20\d{2})\b", clean_name)
+        # junk_re comes from _junk_pattern(), built once per run() from the merged junk words.
+        # Everything from the first year on is release info, so one search yields both the year and
+        # where the title ends. Only the extension is left out, and it never holds a year
+        clean_name = os.path.splitext(filename)[0]
+        year_match = YEAR_RE.search(clean_name)
         year = None
         if year_match:
             year = int(year_match.group(0))
             clean_name = clean_name[:year_match.start()]
 
-        clean_name = re.sub(r"[\._\[\]\(\)-]", " ", clean_name)
-        clean_name = re.sub(r"[\(\[].*?[\)\]]", "", clean_name)
-
-        tokens = clean_name.split()
-        default_junk = {'4k', '1080p', '720p', 'uhd', 'bluray', 'web-dl', 'webrip', 'x264', 'x265', 'hevc'}
-        all_junk = junk_words.union(default_junk)
-
-        title_tokens = []
-        for t in tokens:
-            is_year_digit = t.isdigit() and len(t) == 4 and (t.startswith('19') or t.startswith('20'))
-            if t.lower() not in all_junk and not is_year_digit:
-                title_tokens.append(t)
-
-        title = " ".join(title_tokens).strip()
-
-        if not year:
-            final_year_match = re.search(r"\b(19\d{2}|20\d{2})\b", filename)
-            if final_year_match:
-                year = int(final_year_match.group(0))
+        # Blank out whole junk and year tokens, then one pass picks out the words between separators and
+        # whitespace. Brackets are separators themselves, so there is no bracketed text left to strip
+        title = " ".join(TOKEN_RE.findall(junk_re.sub(" ", clean_name)))
 
         if not title:
             return None
 
-        if title.lower() in self.junk_titles:
+        if title.lower() in JUNK_TITLES:
             logger.info(f"Skipping junk/sample file: [yellow]{filename}[/yellow]")
             return None
 
         return title, year
 
-    def _scan_for_videos(self) -> List[Path]:
-        # Recursively scans the entire movie directory for video files.
+    def _scan_for_videos(self, skip: Set[str]) -> List[Path]:
+        # Recursively scans the entire movie directory for video files, leaving out the paths in skip.
         root_path = self.fs_manager.download_folder
         logger.info(f"Recursively scanning for videos in [cyan]{root_path}[/cyan]...")
 
-        video_files = [
-            p for p in root_path.rglob("*")
-            if p.is_file() and p.suffix.lower() in self.video_extensions
-            and "-trailer" not in p.stem and p.name != "library.json"
-        ]
+        video_files = []
+        for path in find_files(root_path, self.video_extensions):
+            if path in skip:
+                continue
+            name = os.path.basename(path)
+            if "-trailer" not in os.path.splitext(name)[0] and name != "library.json":
+                video_files.append(Path(path))
         return video_files
 
+    def _has_trailer(self, folder_name: str) -> bool:
+        # Recorded in the library cache so the status and fetch menus don't have to probe every folder
+        return self.fs_manager.get_movie_paths(folder_name).get_trailer_path() is not None
+
+    def _library_mtime(self) -> Optional[int]:
+        try:
+            return self.library_cache_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
     def _load_library_cache(self) -> Dict[str, Dict]:
-        if self.library_cache_path.exists():
+        migrate_json_to_jsonl(self.fs_manager.download_folder / LEGACY_LIBRARY_FILENAME, self.library_cache_path)
+        mtime = self._library_mtime()
+        if self._library_cache is None or mtime != self._library_cache_mtime:
             try:
-                with self.library_cache_path.open("r", encoding="utf-8") as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
-                logger.warning("[yellow]Library cache is corrupt. Starting fresh.[/yellow]")
-        return {}
-
-    def _save_library_cache(self, cache: Dict):
+                self._library_cache = load_jsonl_dict(self.library_cache_path)
+            except FileNotFoundError:
+                self._library_cache = {}
+            self._library_cache_mtime = mtime
+        return self._library_cache
+
+    def _append_library_entries(self, entries: Dict[str, Dict]) -> bool:
+        # New entries are appended as lines, so cataloging never rewrites what is already in the file.
+        # The in-memory copy follows along only if it still matched the file before this append
+        fresh = self._library_cache is not None and self._library_mtime() == self._library_cache_mtime
         try:
-            with self.library_cache_path.open("w", encoding="utf-8") as f:
-                json.dump(cache, f, indent=4)
-            logger.info(f"💾 Library cache saved to [cyan]{self.library_cache_path}[/cyan]")
-        except IOError as e:
+            append_jsonl(self.library_cache_path, ({movie_id: data} for movie_id, data in entries.items()))
+        except OSError as e:
             logger.error(f"Failed to save library cache: {e}")
+            # The file may now hold part of the batch; reload it next time rather than guess
+            self._library_cache = None
+            return False
+        if fresh:
+            self._library_cache.update(entries)
+            self._library_cache_mtime = self._library_mtime()
+        else:
+            self._library_cache = None
+        return True
 
     def run(self):
-        junk_words = self.junk_service.build_junk_cache()
+        junk_re = _junk_pattern(self.junk_service.build_junk_cache() | DEFAULT_JUNK_WORDS)
         library_cache = self._load_library_cache()
 
         unparseable_files = []
         unmatched_files = []
         operations = []
-        cache_updated_with_clean_files = False
+        # Already well-named files found during the scan; written out with the file operations' entries
+        clean_entries: Dict[str, Dict] = {}
         collection_files_found = []
 
-        video_files = self._scan_for_videos()
+        # Already cataloged files are dropped by the scan itself, so a mostly-cataloged library
+        # never builds a Path or a progress step for them
+        cataloged_paths = {e['file_path'] for e in library_cache.values() if 'file_path' in e}
+        video_files = self._scan_for_videos(cataloged_paths)
         if not video_files:
             logger.info("No new video files found to process.")
             return
 
-        with Progress(console=self.console) as progress:
+        with Progress(console=self.console, refresh_per_second=PROGRESS_REFRESH_PER_SECOND) as progress:
             task = progress.add_task("Processing files...", total=len(video_files))
+            # First pass is local only: settle every file that needs no TMDB search, queue the rest
+            lookups = []
+            download_folder = self.fs_manager.download_folder
             for file_path in video_files:
                 try:
-                    relative_path = file_path.relative_to(self.fs_manager.download_folder)
+                    relative_path = file_path.relative_to(download_folder)
                 except ValueError:
                     relative_path = file_path
 
@@ -144,47 +184,54 @@ class SanitizerService:
                 depth = len(relative_path.parts)
                 if depth > 2:
                     collection_files_found.append(str(relative_path))
-                    progress.advance(task)
-                    continue
-
-                if str(file_path) in [e.get('file_path') for e in library_cache.values()]:
-                    progress.advance(task)
                     continue
 
-                # Check if file is *already* perfectly named AND in the right folder
-                if self._is_normalized_filename(file_path.stem) and file_path.stem == file_path.parent.name:
-                    parsed_data = self._parse_normalized_filename(file_path.stem)
-                    if parsed_data:
-                        title, year = parsed_data
-                        movie_data = self.tmdb_service.search_movie(title, year)
-                        if movie_data:
-                            movie_id = str(movie_data['id'])
-                            library_cache[movie_id] = {
-                                "title": movie_data['title'],
-                                "year": movie_data['release_date'][:4],
-                                "file_path": str(file_path)
-                            }
-                            cache_updated_with_clean_files = True
-                        else:
-                            unmatched_files.append(str(relative_path))
-                    else:
-                        unparseable_files.append(str(relative_path))
-
-                    progress.advance(task)
-                    continue
-
-                # File is messy, in the wrong folder, or a junk file.
-                parsed_data = self._parse_filename(file_path.name, junk_words)
+                # Check if file is *already* perfectly named AND in the right folder.
+                # Path re-derives stem on every access, so it is read once
+                stem = file_path.stem
+                is_clean = is_normalized_filename(stem) and stem == file_path.parent.name
+                if is_clean:
+                    parsed_data = self._parse_normalized_filename(stem)
+                else:
+                    # File is messy, in the wrong folder, or a junk file.
+                    parsed_data = self._parse_filename(file_path.name, junk_re)
                 if not parsed_data:
                     unparseable_files.append(str(relative_path))
-                    progress.advance(task)
                     continue
 
-                title, year = parsed_data
-                movie_data = self.tmdb_service.search_movie(title, year)
+                lookups.append((file_path, relative_path, is_clean, parsed_data))
+
+            # This pass finishes in moments, so the files it settled are counted in one step rather than
+            # taking the progress lock per file
+            progress.advance(task, len(video_files) - len(lookups))
+
+            # Files that parse to the same title and year (multi-part movies, extras) share one search.
+            # Searches are network round-trips, so the unique ones run side by side
+            files_per_query = Counter(lookup[3] for lookup in lookups)
+            found: Dict[Tuple[str, Optional[int]], Optional[Dict]] = {}
+            with ThreadPoolExecutor(
+                max_workers=max(1, min(SEARCH_WORKERS, len(files_per_query))), thread_name_prefix="Search"
+            ) as pool:
+                results = pool.map(lambda query: self.tmdb_service.search_movie(*query), files_per_query)
+                for query, movie_data in zip(files_per_query, results):
+                    found[query] = movie_data
+                    progress.advance(task, files_per_query[query])
+
+            # Built in file order, so operations and cache entries don't depend on which search finished first
+            for file_path, relative_path, is_clean, query in lookups:
+                movie_data = found[query]
                 if not movie_data:
                     unmatched_files.append(str(relative_path))
-                    progress.advance(task)
+                    continue
+
+                if is_clean:
+                    movie_id = str(movie_data['id'])
+                    clean_entries[movie_id] = {
+                        "title": movie_data['title'],
+                        "year": movie_data['release_date'][:4],
+                        "file_path": str(file_path),
+                        "has_trailer": self._has_trailer(file_path.parent.name)
+                    }
                     continue
 
                 new_folder_name = self.fs_manager.prepare_movie_folder_name(
@@ -193,16 +240,15 @@ class SanitizerService:
                 new_file_name = f"{new_folder_name}{file_path.suffix}"
 
                 source_folder = file_path.parent
-                dest_folder = self.fs_manager.download_folder / new_folder_name
+                dest_folder = download_folder / new_folder_name
                 dest_file = dest_folder / new_file_name
 
                 if file_path == dest_file:
-                    progress.advance(task)
                     continue
 
                 # --- THIS IS THE FIX ---
                 op_type = ""
-                if source_folder == self.fs_manager.download_folder:
+                if source_folder == download_folder:
                     # File is in the root, needs to be moved into a folder
                     op_type = "move_file"
                 elif source_folder == dest_folder:
@@ -221,13 +267,15 @@ class SanitizerService:
                     "dest_file": dest_file,
                     "movie_data": movie_data
                 })
-                progress.advance(task)
+
+        self.tmdb_service.save_search_cache()
 
         if operations:
-            self._execute_operations(operations, library_cache)
-        elif cache_updated_with_clean_files:
+            self._execute_operations(operations, clean_entries)
+        elif clean_entries:
             logger.info("No files to move. Updating library cache with clean files...")
-            self._save_library_cache(library_cache)
+            if self._append_library_entries(clean_entries):
+                logger.info(f"💾 Library cache saved to [cyan]{self.library_cache_path}[/cyan]")
         else:
             logger.info("Library is already up-to-date.")
 
@@ -251,7 +299,7 @@ class SanitizerService:
             for f in collection_files_found:
                 logger.warning(f"    - {f}")
 
-    def _execute_operations(self, operations: List[Dict], cache: Dict):
+    def _execute_operations(self, operations: List[Dict], clean_entries: Dict[str, Dict]):
         if self.is_dry_run():
             logger.info("[bold yellow]DRY RUN MODE: The following changes are planned:[/bold yellow]")
             for op in operations:
@@ -268,15 +316,17 @@ class SanitizerService:
             padding = (width - len(prompt_text.strip().replace("[bold]", "").replace("[/bold]", ""))) // 2
 
             if self.console.input(" " * padding + prompt_text).strip().lower() == 'y':
-                    self._run_file_operations(operations, cache)
+                    self._run_file_operations(operations, clean_entries)
             else:
                 logger.info("Aborted by user.")
         else:
-            self._run_file_operations(operations, cache)
+            self._run_file_operations(operations, clean_entries)
 
-    def _run_file_operations(self, operations: List[Dict], cache: Dict):
+    def _run_file_operations(self, operations: List[Dict], clean_entries: Dict[str, Dict]):
         logger.info("Executing file operations...")
-        with Progress(console=self.console) as progress:
+        # Each move is recorded as soon as it succeeds, so an interrupted run keeps what it already did
+        saved = not clean_entries or self._append_library_entries(clean_entries)
+        with Progress(console=self.console, refresh_per_second=PROGRESS_REFRESH_PER_SECOND) as progress:
             task = progress.add_task("Applying changes...", total=len(operations))
             for op in operations:
                 movie_id = str(op['movie_data']['id'])
@@ -286,7 +336,7 @@ class SanitizerService:
                     if op["op_type"] == "move_file":
                         # This is a file from the root
                         op["dest_folder"].mkdir(parents=True, exist_ok=True)
-                        shutil.move(op["source_file"], op["dest_file"])
+                        move_path(op["source_file"], op["dest_file"])
                         logger.info(f"  [green]MOVED:[/] '{op['source_file'].name}' -> '{op['dest_file']}'")
 
                     elif op["op_type"] == "rename_folder":
@@ -296,7 +346,7 @@ class SanitizerService:
                             progress.advance(task)
                             continue
 
-                        shutil.move(op["source_folder"], op["dest_folder"])
+                        move_path(op["source_folder"], op["dest_folder"])
                         logger.info(f"  [green]RENAMED FOLDER:[/] '{op['source_folder'].name}' -> '{op['dest_folder'].name}'")
 
                         old_file_in_new_home = op["dest_folder"] / op["source_file"].name
@@ -308,16 +358,17 @@ class SanitizerService:
 
                     elif op["op_type"] == "rename_file_in_place":
                         # This is a file in a correct folder that just needs a file rename
-                        shutil.move(op["source_file"], op["dest_file"])
+                        move_path(op["source_file"], op["dest_file"])
                         logger.info(f"  [blue]RENAMED FILE:[/] '{op['source_file'].name}' -> '{op['dest_file'].name}'")
                     # --- END OF FIX ---
 
                     # Add to cache on success
-                    cache[movie_id] = {
+                    saved = self._append_library_entries({movie_id: {
                         "title": op['movie_data']['title'],
                         "year": op['movie_data']['release_date'][:4],
-                        "file_path": str(op['dest_file'])
-                    }
+                        "file_path": str(op['dest_file']),
+                        "has_trailer": self._has_trailer(op['dest_folder'].name)
+                    }}) and saved
                 except Exception as e:
                     error_msg = f"  [red]FAILED to process {op['source_file'].name}: {e}[/red]"
                     logger.error(error_msg)
@@ -326,4 +377,5 @@ class SanitizerService:
 
                 progress.advance(task)
 
-        self._save_library_cache(cache)
\ No newline at end of file
+        if saved:
+            logger.info(f"💾 Library cache saved to [cyan]{self.library_cache_path}[/cyan]")
\ No newline at end of file
@@ -1,13 +1,48 @@
 import json
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
 
 import requests
-from config import BASE_URL, DISCOVER_URL
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import BASE_URL, DISCOVER_URL, SEARCH_CACHE_FILENAME, TRAILER_KEYS_FILENAME
+from utils import atomic_write_bytes, json_dumps, json_loads, read_json_file
 
 logger = logging.getLogger("media_manager")
 
+# Enough pooled connections for the TMDB and search worker pools to each keep one open
+HTTP_POOL_SIZE = 32
+# Transient statuses retried by the session itself, with a short backoff (honouring Retry-After on 429)
+HTTP_RETRY = Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504))
+# Discover pages in flight at once for one year
+PAGE_WORKERS = 8
+# (video type, official) -> rank when picking a movie's trailer; lower wins, anything else is ignored
+TRAILER_PRIORITIES = {
+    ("Trailer", True): 1,
+    ("Trailer", False): 2,
+    ("Teaser", True): 3,
+    ("Teaser", False): 4,
+}
+UNRANKED = len(TRAILER_PRIORITIES) + 1
+
+
+def _response_json(resp: requests.Response) -> Dict:
+    # Parsed with orjson when it is installed. A malformed body still surfaces as a RequestException,
+    # as it did from resp.json(), so callers keep a single except clause
+    try:
+        return json_loads(resp.content)
+    except ValueError as e:
+        raise requests.exceptions.InvalidJSONError(str(e), response=resp) from e
+
+
+def _trailer_rank(video: Dict) -> int:
+    return TRAILER_PRIORITIES.get((video.get("type"), video.get("official", False)), UNRANKED)
+
 
 class TMDbService:
     def __init__(self, api_key: str, cache_folder: str, pages_per_year: int, tmdb_filters: Dict):
@@ -15,25 +50,91 @@ class TMDbService:
         self.cache_folder = Path(cache_folder).expanduser()
         self.pages_per_year = pages_per_year
         self.tmdb_filters = tmdb_filters
+        # Filters are fixed for the run, so encode them into the discover URL once
+        self._discover_url = f"{DISCOVER_URL}?{urlencode(tmdb_filters)}" if tmdb_filters else DISCOVER_URL
+        # One keep-alive session, so calls after the first skip the TCP and TLS handshakes
+        self._session = requests.Session()
+        self._session.headers.update({"Accept": "application/json"})
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE, max_retries=HTTP_RETRY)
+        self._session.mount("https://", adapter)
         self.cache_folder.mkdir(parents=True, exist_ok=True)
         self.cache_file = self.cache_folder / "movies_cache.json"
+        # movie ID (as a string, like the JSON keys) -> YouTube key. Only found keys are kept, since a
+        # movie without a trailer today may get one later. Loaded on first lookup, saved by save_trailer_keys
+        self.trailer_keys_file = self.cache_folder / TRAILER_KEYS_FILENAME
+        self._trailer_keys: Optional[Dict[str, str]] = None
+        self._trailer_keys_dirty = False
+        self._trailer_keys_lock = threading.Lock()
+        # "lowercased title|year" -> first search result, or None for no match. Only matches are written to
+        # disk, since TMDB may list a missing movie later. Loaded on first search, saved by save_search_cache
+        self.search_cache_file = self.cache_folder / SEARCH_CACHE_FILENAME
+        self._search_memo: Optional[Dict[str, Optional[Dict]]] = None
+        self._search_memo_dirty = False
+        self._search_memo_lock = threading.Lock()
 
     def search_movie(self, title: str, year: Optional[int]) -> Optional[Dict]:
+        # Files that parse to the same title (multi-part movies, re-runs in one session) share one search
+        memo = self._load_search_memo()
+        memo_key = f"{title.lower()}|{year or ''}"
+        if memo_key in memo:
+            return memo[memo_key]
         try:
-            url = f"{BASE_URL}/search/movie"
-            params = {"api_key": self.api_key, "query": title}
-            if year:
-                params["year"] = str(year)
-
-            resp = requests.get(url, params=params, timeout=10)
-            resp.raise_for_status()
-            results = resp.json().get("results", [])
-
-            # Simple logic: return the first result if it exists
-            return results[0] if results else None
+            result = self._fetch_search_result(title, year)
         except requests.RequestException as e:
+            # Not memoized, so a later file with this title tries again
             logger.warning(f"Failed to search for movie '{title}': {e}")
             return None
+        with self._search_memo_lock:
+            memo[memo_key] = result
+            if result is not None:
+                self._search_memo_dirty = True
+        return result
+
+    def save_search_cache(self):
+        with self._search_memo_lock:
+            if not self._search_memo_dirty:
+                return
+            matches = {key: result for key, result in self._search_memo.items() if result is not None}
+            try:
+                atomic_write_bytes(self.search_cache_file, json_dumps(matches))
+                self._search_memo_dirty = False
+            except OSError as e:
+                logger.error(f"Failed to write search cache: {e}")
+
+    def clear_search_cache(self):
+        with self._search_memo_lock:
+            self.search_cache_file.unlink(missing_ok=True)
+            self._search_memo = {}
+            self._search_memo_dirty = False
+
+    def _load_search_memo(self) -> Dict[str, Optional[Dict]]:
+        memo = self._search_memo
+        if memo is not None:
+            return memo
+        # The sanitizer searches from several threads; only the first one reads the file
+        with self._search_memo_lock:
+            if self._search_memo is None:
+                try:
+                    self._search_memo = read_json_file(self.search_cache_file)
+                except FileNotFoundError:
+                    self._search_memo = {}
+                except (OSError, ValueError):
+                    logger.warning("[yellow]Warning:[/] Search cache is corrupt. Starting fresh.")
+                    self._search_memo = {}
+            return self._search_memo
+
+    def _fetch_search_result(self, title: str, year: Optional[int]) -> Optional[Dict]:
+        url = f"{BASE_URL}/search/movie"
+        params = {"api_key": self.api_key, "query": title}
+        if year:
+            params["year"] = str(year)
+
+        resp = self._session.get(url, params=params, timeout=10)
+        resp.raise_for_status()
+        results = _response_json(resp).get("results", [])
+
+        # Simple logic: return the first result if it exists
+        return results[0] if results else None
 
     def fetch_movies(self, year_start: int, year_end: int, no_cache: bool, clear_cache: bool) -> List[Dict]:
         if clear_cache and self.cache_file.exists():
@@ -43,8 +144,7 @@ class TMDbService:
         cached_movies_by_year: Dict[str, List[Dict]] = {}
         if not no_cache and self.cache_file.exists():
             try:
-                with self.cache_file.open("r", encoding="utf-8") as f:
-                    cached_movies_by_year = json.load(f)
+                cached_movies_by_year = read_json_file(self.cache_file)
             except json.JSONDecodeError:
                 logger.warning("[yellow]Warning:[/] Cache file is corrupt. Starting fresh.")
 
@@ -68,54 +168,111 @@ class TMDbService:
         return all_movies
 
     def _fetch_movies_for_year(self, year: int) -> List[Dict]:
-        year_movies = []
-        for page in range(1, self.pages_per_year + 1):
-            params = self.tmdb_filters.copy()
-            params.update({"api_key": self.api_key, "primary_release_year": year, "page": page})
-            try:
-                resp = requests.get(DISCOVER_URL, params=params, timeout=20)
-                resp.raise_for_status()
-                results = resp.json().get("results", [])
+        # Page 1 also says how many pages exist, so the rest are requested side by side, capped at that
+        try:
+            results, total_pages = self._fetch_discover_page(year, 1)
+        except requests.RequestException as e:
+            logger.warning(f"[yellow]Warning:[/] TMDB request failed for year {year}, page 1: {e}")
+            return []
+        year_movies = list(results)
+        pages = range(2, min(self.pages_per_year, total_pages) + 1)
+        if not results or not pages:
+            return year_movies
+
+        with ThreadPoolExecutor(max_workers=min(PAGE_WORKERS, len(pages)), thread_name_prefix="TMDB") as pool:
+            futures = [pool.submit(self._fetch_discover_page, year, page) for page in pages]
+            # Stop at the first empty or failed page, as the sequential loop did
+            for page, future in zip(pages, futures):
+                try:
+                    results, _ = future.result()
+                except requests.RequestException as e:
+                    logger.warning(f"[yellow]Warning:[/] TMDB request failed for year {year}, page {page}: {e}")
+                    results = None
                 if not results:
+                    for rest in futures:
+                        rest.cancel()
                     break
                 year_movies.extend(results)
-            except requests.RequestException as e:
-                logger.warning(f"[yellow]Warning:[/] TMDB request failed for year {year}, page {page}: {e}")
-                break
         return year_movies
 
+    def _fetch_discover_page(self, year: int, page: int) -> Tuple[List[Dict], int]:
+        params = {"api_key": self.api_key, "primary_release_year": year, "page": page}
+        resp = self._session.get(self._discover_url, params=params, timeout=20)
+        resp.raise_for_status()
+        data = _response_json(resp)
+        return data.get("results", []), data.get("total_pages", page)
+
     def _save_cache(self, data: Dict):
         try:
-            with self.cache_file.open("w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
+            # Machine-only and the largest cache, so it is written compact
+            atomic_write_bytes(self.cache_file, json_dumps(data))
             logger.info(f"Updated cache with new data.")
         except IOError as e:
             logger.error(f"Failed to write to cache file: {e}")
 
     def get_trailer_key(self, movie_id: int) -> Optional[str]:
+        keys = self._load_trailer_keys()
+        cached = keys.get(str(movie_id))
+        if cached:
+            return cached
+        key = self._fetch_trailer_key(movie_id)
+        if key:
+            with self._trailer_keys_lock:
+                keys[str(movie_id)] = key
+                self._trailer_keys_dirty = True
+        return key
+
+    def forget_trailer_key(self, movie_id: int):
+        # For keys that stopped working, so the next lookup asks TMDB again
+        with self._trailer_keys_lock:
+            if self._trailer_keys and self._trailer_keys.pop(str(movie_id), None):
+                self._trailer_keys_dirty = True
+
+    def save_trailer_keys(self):
+        with self._trailer_keys_lock:
+            if not self._trailer_keys_dirty:
+                return
+            try:
+                atomic_write_bytes(self.trailer_keys_file, json_dumps(self._trailer_keys))
+                self._trailer_keys_dirty = False
+            except OSError as e:
+                logger.error(f"Failed to write trailer key cache: {e}")
+
+    def clear_trailer_keys(self):
+        with self._trailer_keys_lock:
+            self.trailer_keys_file.unlink(missing_ok=True)
+            self._trailer_keys = {}
+            self._trailer_keys_dirty = False
+
+    def _load_trailer_keys(self) -> Dict[str, str]:
+        keys = self._trailer_keys
+        if keys is not None:
+            return keys
+        # The prefetch pool calls in from many threads at once; only the first one reads the file
+        with self._trailer_keys_lock:
+            if self._trailer_keys is None:
+                try:
+                    self._trailer_keys = read_json_file(self.trailer_keys_file)
+                except FileNotFoundError:
+                    self._trailer_keys = {}
+                except (OSError, ValueError):
+                    logger.warning("[yellow]Warning:[/] Trailer key cache is corrupt. Starting fresh.")
+                    self._trailer_keys = {}
+            return self._trailer_keys
+
+    def _fetch_trailer_key(self, movie_id: int) -> Optional[str]:
         try:
             url = f"{BASE_URL}/movie/{movie_id}/videos"
             params = {"api_key": self.api_key}
-            resp = requests.get(url, params=params, timeout=10)
+            resp = self._session.get(url, params=params, timeout=10)
             resp.raise_for_status()
-            videos = resp.json().get("results", [])
+            videos = _response_json(resp).get("results", [])
             youtube_videos = [v for v in videos if v.get("site") == "YouTube"]
-            priorities = {
-                ("Trailer", True): 1,
-                ("Trailer", False): 2,
-                ("Teaser", True): 3,
-                ("Teaser", False): 4,
-            }
-            best_video = None
-            lowest_priority = float('inf')
-            for v in youtube_videos:
-                v_type = v.get("type")
-                v_official = v.get("official", False)
-                priority = priorities.get((v_type, v_official))
-                if priority is not None and priority < lowest_priority:
-                    best_video = v
-                    lowest_priority = priority
-            return best_video.get("key") if best_video else None
+            # min keeps the first of equally ranked videos, as the old scan did
+            best_video = min(youtube_videos, key=_trailer_rank, default=None)
+            if best_video is None or _trailer_rank(best_video) == UNRANKED:
+                return None
+            return best_video.get("key")
         except requests.RequestException:
             logger.warning(f"Failed to fetch trailer key for movie ID {movie_id}.")
             return None
\ No newline at end of file
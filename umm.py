@@ -1,7 +1,11 @@
+import atexit
+import importlib
 import logging
 import sys
+import threading
 import time
-import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
 from rich import box
@@ -10,24 +14,49 @@ from rich.logging import RichHandler
 from rich.panel import Panel
 from rich.text import Text
 from rich.rule import Rule
+from rich.segment import Segments
 from rich.align import Align
 
-from config import load_config, STATUS_FILENAME
-from media_manager import MediaManager
+from config import load_config, FirstRunCreated, STATUS_FILENAME
+from utils import atomic_write_bytes, json_dumps
 
 console = Console()
 logger = logging.getLogger("media_manager")
 DRY_RUN = True # Default ON for safety
-
-def _update_last_run_time(status_path: Path):
-    # Saves the current timestamp to the status file
+# Seconds between status file writes while the menu is in use
+STATUS_WRITE_INTERVAL = 30
+_last_status_write = 0.0
+# Menu choice -> MediaManager method. Names rather than bound methods, since the manager is built
+# in the background after the menu is first shown
+MANAGER_ACTIONS = {
+    "1": "sanitize_and_catalog_library",
+    "2": "fetch_trailers_for_existing_movies",
+    "3": "fetch_upcoming_movie_trailers",
+    "4": "sync_trailers_with_library",
+    "5": "show_library_status",
+    "6": "show_settings_and_utilities",
+}
+# Choices whose output stays on screen until Enter is pressed
+PAUSE_AFTER = frozenset({"1", "2", "3", "4", "5"})
+
+def _update_last_run_time(status_path: Path, force: bool = False):
+    # Saves the current timestamp to the status file. The menu calls this on every redraw, so writes
+    # closer together than STATUS_WRITE_INTERVAL are skipped; exit forces a final one
+    global _last_status_write
+    now = time.time()
+    if not force and now - _last_status_write < STATUS_WRITE_INTERVAL:
+        return
     try:
         status_path.parent.mkdir(parents=True, exist_ok=True)
-        with status_path.open("w", encoding="utf-8") as f:
-            json.dump({"last_run": time.time()}, f)
+        atomic_write_bytes(status_path, json_dumps({"last_run": now}))
+        _last_status_write = now
     except IOError as e:
         logger.warning(f"Could not update last run time: {e}")
 
+def _create_manager(config: dict):
+    from media_manager import MediaManager
+    return MediaManager(config, console, lambda: DRY_RUN)
+
 def setup_logging(level: str = "INFO"):
 
     logger = logging.getLogger("media_manager")
@@ -47,9 +76,7 @@ def setup_logging(level: str = "INFO"):
 
     logger.addHandler(rich_handler)
 
-def print_menu():
-    console.clear()
-    ascii_art = r"""
+ASCII_ART = r"""
  █████ ████ █████████████   █████████████
 ░░███ ░███ ░░███░░███░░███ ░░███░░███░░███
  ░███ ░███  ░███ ░███ ░███  ░███ ░███ ░███
@@ -57,21 +84,27 @@ def print_menu():
  ░░████████ █████░███ █████ █████░███ █████ ██ ██ ██
   ░░░░░░░░ ░░░░░ ░░░ ░░░░░ ░░░░░ ░░░ ░░░░░ ░░ ░░ ░░
 """
-    console.print(Align.center(f"[bold cyan]{ascii_art}[/bold cyan]"))
-    console.print(Align.center("[dim]Unified (Unreasonable) Media Manager[/dim]\n"))
-
-    dry_run_status = "[bold green]ON[/]" if DRY_RUN else "[bold red]OFF[/]"
-
-    # Option list
-    options_text = Text.from_markup(
-        "[bold green][1][/bold green] Sanitize & Catalog Movie Library\n"
-        "[bold green][2][/bold green] Fetch Trailers for Existing Movies\n"
-        "[bold green][3][/bold green] Fetch Upcoming Movie Trailers\n"
-        "[bold green][4][/bold green] Sync Trailers with Movie Library\n"
-        "[bold green][5][/bold green] Library Status\n"
-        "[bold green][6][/bold green] Settings and Utilities\n"
-        "[bold red][0][/bold red] Exit"
-    )
+
+# Everything on the menu but the dry-run state is fixed, so the markup is parsed once at import
+MENU_HEADER = Group(
+    Align.center(Text.from_markup(f"[bold cyan]{ASCII_ART}[/bold cyan]")),
+    Align.center(Text.from_markup("[dim]Unified (Unreasonable) Media Manager[/dim]\n")),
+)
+
+# Option list
+MENU_OPTIONS = Text.from_markup(
+    "[bold green][1][/bold green] Sanitize & Catalog Movie Library\n"
+    "[bold green][2][/bold green] Fetch Trailers for Existing Movies\n"
+    "[bold green][3][/bold green] Fetch Upcoming Movie Trailers\n"
+    "[bold green][4][/bold green] Sync Trailers with Movie Library\n"
+    "[bold green][5][/bold green] Library Status\n"
+    "[bold green][6][/bold green] Settings and Utilities\n"
+    "[bold red][0][/bold red] Exit"
+)
+
+@lru_cache(maxsize=2)
+def _menu_panel(dry_run: bool) -> Align:
+    dry_run_status = "[bold green]ON[/]" if dry_run else "[bold red]OFF[/]"
 
     # Toggle section
     toggle_text = Text.from_markup(
@@ -80,7 +113,7 @@ def print_menu():
 
     # Combine everything with a separator rule
     menu_group = Group(
-        options_text,
+        MENU_OPTIONS,
         Rule(style="cyan dim"),
         toggle_text
     )
@@ -96,15 +129,33 @@ def print_menu():
     )
 
     # left the whole panel for symmetry
-    console.print(Align.center(menu_panel))
+    return Align.center(menu_panel)
+
+@lru_cache(maxsize=8)
+def _menu_segments(dry_run: bool, width: int) -> Segments:
+    # The laid-out menu only changes with the dry-run state and the terminal width, so each
+    # combination is rendered to segments once and replayed on later redraws
+    options = console.options.update_width(width)
+    return Segments(list(console.render(Group(MENU_HEADER, _menu_panel(dry_run)), options)))
+
+def print_menu():
+    console.clear()
+    console.print(_menu_segments(DRY_RUN, console.width))
 
 
 def main():
     global DRY_RUN
-    start_time = time.monotonic()
+    start_ns = time.monotonic_ns()
+
+    # Start compiling/importing media_manager while the config is read and checked. A daemon thread,
+    # so the first-run and missing-key exits below never wait for it
+    threading.Thread(target=importlib.import_module, args=("media_manager",), daemon=True).start()
 
     setup_logging("INFO")
-    config = load_config()
+    try:
+        config = load_config()
+    except FirstRunCreated:
+        sys.exit(0)
 
     try:
         cache_folder = Path(config["CACHE_FOLDER"]).expanduser()
@@ -119,7 +170,13 @@ def main():
             )
         sys.exit(1)
 
-    manager = MediaManager(config, console, lambda: DRY_RUN)
+    # The manager is built in the background too, finishing the import started above (requests,
+    # rich.progress and every service module) while the user reads the first menu. It is only
+    # waited on once a choice needs the manager
+    startup = ThreadPoolExecutor(max_workers=1, thread_name_prefix="Startup")
+    manager_future = startup.submit(_create_manager, config)
+    startup.shutdown(wait=False)
+    atexit.register(_update_last_run_time, status_path, force=True)
 
     while True:
             _update_last_run_time(status_path)
@@ -130,19 +187,9 @@ def main():
             padding = (width - len(prompt_text)) // 2
 
             choice = console.input(" " * padding + prompt_text).strip().lower()
-
-            if choice == "1":
-                manager.sanitize_and_catalog_library()
-            elif choice == "2":
-                manager.fetch_trailers_for_existing_movies()
-            elif choice == "3":
-                manager.fetch_upcoming_movie_trailers()
-            elif choice == "4":
-                manager.sync_trailers_with_library()
-            elif choice == "5":
-                manager.show_library_status()
-            elif choice == "6":
-                manager.show_settings_and_utilities()
+            action = MANAGER_ACTIONS.get(choice)
+            if action is not None:
+                getattr(manager_future.result(), action)()
             elif choice == "d":
                 DRY_RUN = not DRY_RUN
             elif choice == "0":
@@ -151,13 +198,12 @@ def main():
                 console.print("[bold red]Invalid option, please try again.[/bold red]")
                 time.sleep(1)
 
-            if choice in "12345":
+            if choice in PAUSE_AFTER:
                 console.input("\nPress Enter to return to the menu...")
 
 
-    end_time = time.monotonic()
-    duration_s = end_time - start_time
-    minutes, seconds = divmod(int(duration_s), 60)
+    duration_s = (time.monotonic_ns() - start_ns) // 1_000_000_000
+    minutes, seconds = divmod(duration_s, 60)
     duration_str = f"{minutes:02d}m {seconds:02d}s"
     logging.getLogger("media_manager").info(
         f"[green]✅ UMM session complete![/green] Total duration: {duration_str}"
@@ -1,36 +1,153 @@
+import bisect
+import errno
+import json
 import logging
+import mmap
+import os
+import shutil
 import subprocess
 import time
-from typing import List, Optional, Tuple
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib codec
+    orjson = None
 
 logger = logging.getLogger("media_manager")
 
-def run_subprocess(cmd: List[str]) -> Tuple[bool, Optional[str], Optional[str]]:
+# Below this size a plain read() is cheaper than setting up a mapping
+MMAP_MIN_SIZE = 64 * 1024
+# format_time_ago: (seconds per unit, suffix) for ages below each bound in TIME_AGO_BOUNDS, then days
+TIME_AGO_BOUNDS = (3600, 86400)
+TIME_AGO_UNITS = ((60, "m"), (3600, "h"), (86400, "d"))
+
+def json_loads(data: bytes) -> Any:
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers only need to catch the latter
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def json_dumps(obj: Any, indent: bool = False) -> bytes:
+    # Always returns UTF-8 bytes so files can be written in binary mode with no re-encoding
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False).encode("utf-8")
+
+def atomic_write_bytes(path: Path, data: bytes):
+    # Write a sibling temp file and rename it over the target, so readers never see a half-written file
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+def read_json_file(path: Path) -> Any:
+    with path.open("rb") as f:
+        return read_json_fileobj(f)
+
+def read_json_fileobj(f: BinaryIO) -> Any:
+    # Large files are mapped and handed to orjson as a buffer, skipping the copy into a bytes object.
+    # mmap can't map empty files and the stdlib parser needs real bytes, so those take the read() path.
+    if orjson is not None and os.fstat(f.fileno()).st_size >= MMAP_MIN_SIZE:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            return orjson.loads(view)
+    return json_loads(f.read())
+
+def iter_jsonl(f: BinaryIO) -> Iterator[Any]:
+    # One JSON document per line. A line that doesn't parse (normally the last one, cut short by a crash
+    # mid-append) is skipped with a warning rather than failing the whole file
+    for line_no, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json_loads(line)
+        except json.JSONDecodeError:
+            logger.warning(f"[yellow]Skipping unreadable line {line_no} in '{getattr(f, 'name', 'file')}'.[/yellow]")
+
+def jsonl_bytes(values: Iterable[Any]) -> bytes:
+    return b"".join(json_dumps(value) + b"\n" for value in values)
+
+def append_jsonl(path: Path, values: Iterable[Any]):
+    data = jsonl_bytes(values)
+    if not data:
+        return
+    with path.open("a+b") as f:
+        # If the previous append was cut short, start on a fresh line so only the torn line is lost
+        if f.tell():
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                data = b"\n" + data
+        f.write(data)
+
+def load_jsonl_dict(path: Path) -> Dict[str, Any]:
+    # Folds {key: value} lines into one dict: a later line for a key replaces it, and a null value removes it
+    result: Dict[str, Any] = {}
+    with path.open("rb") as f:
+        for record in iter_jsonl(f):
+            for key, value in record.items():
+                if value is None:
+                    result.pop(key, None)
+                else:
+                    result[key] = value
+    return result
+
+def write_jsonl_dict(path: Path, data: Dict[str, Any]):
+    # Rewrites the file with one line per key, which also drops any replaced or removed lines
+    atomic_write_bytes(path, jsonl_bytes({key: value} for key, value in data.items()))
+
+def migrate_json_to_jsonl(json_path: Path, jsonl_path: Path):
+    # One-off conversion of a cache saved as a single JSON object into the line-per-key format
+    if jsonl_path.exists() or not json_path.exists():
+        return
+    try:
+        write_jsonl_dict(jsonl_path, read_json_file(json_path))
+        json_path.unlink()
+        logger.info(f"Converted [cyan]{json_path.name}[/cyan] to [cyan]{jsonl_path.name}[/cyan].")
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"[yellow]Could not convert '{json_path}': {e}[/yellow]")
+
+def move_path(src: Union[str, Path], dst: Union[str, Path]):
+    # A rename is one syscall when both sides are on the same filesystem (the usual library layout);
+    # only a cross-device move pays for shutil.move's copy and delete
+    try:
+        os.replace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(src, dst)
+
+def run_subprocess(
+    cmd: List[str], capture: bool = True, log_failure: bool = True
+) -> Tuple[bool, Optional[str], Optional[str]]:
+    # With capture=False stdout is discarded and stderr is kept as raw bytes for the failure path only,
+    # so chatty tools don't fill and decode buffers nobody reads. Output then comes back as None on success.
+    # log_failure=False is for callers that expect a non-zero exit and report failures themselves
     try:
-        proc = subprocess.run(
-            cmd, check=True, capture_output=True, text=True, encoding='utf-8', errors='replace'
-        )
-        return True, proc.stdout, proc.stderr
+        if capture:
+            proc = subprocess.run(
+                cmd, check=True, capture_output=True, text=True, encoding='utf-8', errors='replace'
+            )
+            return True, proc.stdout, proc.stderr
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        return True, None, None
     except FileNotFoundError:
         logger.error(f"[red]Command not found:[/] {cmd[0]}. Is it in your system's PATH?")
         return False, None, None
     except subprocess.CalledProcessError as e:
-        logger.error(f"[red]Subprocess failed for command:[/] {' '.join(cmd)}")
-        logger.debug(f"Stderr: {e.stderr.strip()}")
-        return False, e.stdout, e.stderr
+        if log_failure:
+            logger.error(f"[red]Subprocess failed for command:[/] {' '.join(cmd)}")
+        stderr = e.stderr if capture else e.stderr.decode('utf-8', 'replace')
+        logger.debug(f"Stderr: {stderr.strip()}")
+        return False, e.stdout, stderr
 
-def format_time_ago(timestamp: float) -> str:
+def format_time_ago(timestamp: float, now: Optional[float] = None) -> str:
+    # Pass now when formatting several timestamps so they are measured against the same moment
     if timestamp == 0:
         return "never"
 
-    now = time.time()
-    diff_seconds = now - timestamp
-
+    diff_seconds = (time.time() if now is None else now) - timestamp
     if diff_seconds < 60:
         return "just now"
-    elif diff_seconds < 3600: # Less than 1 hour
-        return f"{int(diff_seconds // 60)}m ago"
-    elif diff_seconds < 86400: # Less than 1 day
-        return f"{int(diff_seconds // 3600)}h ago"
-    else: # More than 1 day
-        return f"{int(diff_seconds // 86400)}d ago"
\ No newline at end of file
+    # First unit whose upper bound is above the age: minutes below an hour, hours below a day, then days
+    unit, suffix = TIME_AGO_UNITS[bisect.bisect_right(TIME_AGO_BOUNDS, diff_seconds)]
+    return f"{int(diff_seconds // unit)}{suffix} ago"
\ No newline at end of file